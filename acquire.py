@@ -0,0 +1,213 @@
+from pymodbus.client import AsyncModbusSerialClient
+from datetime import datetime
+import asyncio
+import os
+import time
+
+from alarms import AlarmMonitor, tag_limits, STATE_NAMES
+from async_poller import try_block_async
+from bus_capture import CaptureWriter, AsyncCaptureClient
+from bus_stats import BusStats, AsyncInstrumentedClient, dump_periodically
+from device_health import HealthMonitor, AsyncHealthClient
+from metrics_server import MetricsServer, METRICS_HOST
+from profiles import load_profiles, compile_profiles, PROFILE_FILE
+from register_map import OK, ILLEGAL
+from ring_store import RingStore, capacity_for, GOOD, FAILED
+
+# One process for every drive on the bus, driven by devices.json.
+
+
+async def read_device(client, dev):
+    """Run the device's precomputed plan into its raw buffer; True if every block answered.
+
+    A bridged block rejected with code 2 (an unmapped illegal address in the gap)
+    makes the device re-plan without that bridge; the tightened blocks are read
+    at once and used from then on.
+    """
+    all_ok = True
+    index = 0
+    while index < len(dev.plan):
+        start, count = dev.plan[index]
+        outcome, registers = await try_block_async(client, dev.device_id, start, count)
+        dev.store_block(index, registers)
+        if outcome == ILLEGAL and dev.drop_bridge(index):
+            continue
+        all_ok = all_ok and outcome == OK
+        index += 1
+    dev.process()
+    return all_ok
+
+
+class Acquisition:
+    """Polls compiled devices on a fixed cycle grid over one shared client.
+
+    on_values(dev, timestamp) is called after each device is read and scaled;
+    the scaled values are in dev.values / dev.as_dict(). on_cycle(acquisition)
+    is called once every device has been read.
+    """
+
+    def __init__(self, client, devices, cycle=2.0, on_values=None, on_cycle=None):
+        self.client = client
+        self.devices = devices
+        self.cycle = cycle
+        self.on_values = on_values or print_values
+        self.on_cycle = on_cycle
+        self.cycles = 0
+        self._stopping = False
+
+    async def run_cycle(self):
+        for dev in self.devices:
+            await read_device(self.client, dev)
+            dev.timestamp = time.time()
+            self.on_values(dev, dev.timestamp)
+        self.cycles += 1
+        if self.on_cycle:
+            self.on_cycle(self)
+
+    async def run(self):
+        next_due = time.monotonic()
+        while not self._stopping:
+            await self.run_cycle()
+            next_due += self.cycle
+            now = time.monotonic()
+            if next_due < now:
+                next_due = now       # Bus slower than the cycle: run back-to-back
+            await asyncio.sleep(next_due - now)
+
+    def stop(self):
+        self._stopping = True
+
+
+def print_values(dev, timestamp):
+    stamp = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+    parts = []
+    for tag, value in zip(dev.tags, dev.values.tolist()):
+        if value != value:  # NaN: block read failed
+            parts.append(f"{tag['name']}=  err")
+        else:
+            parts.append(f"{tag['name']}={value:7.2f} {tag.get('unit', '')}".rstrip())
+    print(f"[{stamp}] {dev.name} (ID {dev.device_id}): " + "  ".join(parts))
+
+
+def alarm_checker(devices):
+    """on_values handler printing limit alarms for tags with "low"/"high" set (None if no tag has any)."""
+    monitors = {dev.device_id: AlarmMonitor(len(dev.tags), *tag_limits(dev.tags))
+                for dev in devices if any("low" in t or "high" in t for t in dev.tags)}
+    if not monitors:
+        return None
+
+    def check(dev, timestamp):
+        monitor = monitors.get(dev.device_id)
+        if monitor is None:
+            return
+        stamp = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+        for i, new, old, value in monitor.update(dev.values, timestamp):
+            print(f"[{stamp}] 🚨 {dev.name} {dev.tag_names[i]}: {STATE_NAMES[old]} → {STATE_NAMES[new]} "
+                  f"at {value:.2f} {dev.tags[i].get('unit', '')}".rstrip())
+
+    return check
+
+
+def store_values(store, dev, timestamp):
+    """Append one sample per tag to the history rings (the device's buffers are reused, nothing is allocated)."""
+    raw = dev.tag_raw()
+    ok = dev.tag_ok()
+    for i, name in enumerate(dev.tag_names):
+        store.append(dev.name, name, timestamp, raw[i], dev.values[i], GOOD if ok[i] else FAILED)
+
+
+def make_client(config):
+    """Async serial client for a profile's port and line settings."""
+    return AsyncModbusSerialClient(
+        port=config["port"],
+        baudrate=config.get("baudrate", 9600),
+        parity=config.get("parity", "E"),
+        stopbits=config.get("stopbits", 1),
+        bytesize=8,
+        timeout=config.get("timeout", 1),
+    )
+
+
+async def main(path=PROFILE_FILE):
+    config = load_profiles(path)
+    devices = compile_profiles(config)
+
+    client = make_client(config)
+
+    print(f"🔌 Connecting to {config['port']}...")
+    if not await client.connect():
+        print("❌ Connection failed.")
+        return
+
+    stats_task = None
+    if config.get("stats_every"):
+        # Per-drive latency/timeout/exception counters, reported every stats_every seconds
+        stats = BusStats(config.get("baudrate", 9600), config.get("parity", "E"), config.get("stopbits", 1))
+        client = AsyncInstrumentedClient(client, stats)
+        stats_task = asyncio.create_task(dump_periodically(stats, config["stats_every"]))
+
+    capture = None
+    if config.get("capture_dir"):
+        # Every read goes to a capture file for offline replay (bus_capture.py replay FILE)
+        capture_dir = os.path.join(os.path.dirname(os.path.abspath(path)), config["capture_dir"])
+        os.makedirs(capture_dir, exist_ok=True)
+        capture = CaptureWriter(os.path.join(capture_dir, f"{datetime.now():%Y%m%d-%H%M%S}.mbc"))
+        client = AsyncCaptureClient(client, capture)
+        print(f"📼 Capturing bus traffic to {capture.path}")
+
+    # Quarantine drives that stop answering so they do not stall the others
+    health = HealthMonitor(dev.device_id for dev in devices)
+    client = AsyncHealthClient(client, health)
+
+    reads = sum(len(dev.plan) for dev in devices)
+    print(f"✅ Connected. {len(devices)} drives, {reads} block reads per cycle.\n")
+    store = None
+    handlers = [print_values]
+    history = config.get("history")
+    if history:
+        # Size for the configured days at the poll cycle rate (1 Hz at most)
+        rate = 1.0 / max(1.0, config.get("cycle", 2))
+        history_dir = os.path.join(os.path.dirname(os.path.abspath(path)), history["dir"])
+        store = RingStore(history_dir, capacity_for(history.get("days", 14), rate))
+        print(f"💾 Keeping {history.get('days', 14)} days of history in {history['dir']}/")
+
+        handlers.insert(0, lambda dev, timestamp: store_values(store, dev, timestamp))
+    check_alarms = alarm_checker(devices)
+    if check_alarms:
+        handlers.append(check_alarms)
+
+    def on_values(dev, timestamp):
+        for handler in handlers:
+            handler(dev, timestamp)
+
+    metrics = None
+    on_cycle = None
+    if config.get("metrics_port"):
+        # Scrapes are answered from the response rendered after the last cycle
+        metrics = await MetricsServer(config.get("metrics_host", METRICS_HOST), config["metrics_port"]).start()
+        print(f"📈 Metrics on http://{metrics.host}:{metrics.port}/metrics")
+
+        def publish_metrics(acquisition):
+            metrics.update(acquisition.devices, health, acquisition.cycles)
+
+        on_cycle = publish_metrics
+
+    acquisition = Acquisition(client, devices, cycle=config.get("cycle", 2), on_values=on_values,
+                              on_cycle=on_cycle)
+    try:
+        await acquisition.run()
+    finally:
+        if stats_task:
+            stats_task.cancel()
+        if metrics:
+            metrics.close()
+        client.close()
+        if store:
+            store.flush()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🔚 Stopped by user.")
@@ -0,0 +1,73 @@
+import numpy as np
+
+# Limit alarms with hysteresis. AlarmMonitor checks a whole block per poll
+# (live); alarm_series() runs the same state machine over one recorded series
+# (replay, bus_capture.py) and gives the same transitions.
+#
+# A value above `high` raises HIGH, which clears once it drops below
+# high - hysteresis (LOW likewise mirrored). NaN (failed read) never changes state.
+
+NORMAL, HIGH, LOW = 0, 1, -1
+STATE_NAMES = {NORMAL: "normal", HIGH: "HIGH", LOW: "LOW"}
+
+
+def tag_limits(tags):
+    """(low, high, hysteresis) arrays from tag dicts; missing limits never trip."""
+    low = np.array([t.get("low", -np.inf) for t in tags], dtype=np.float64)
+    high = np.array([t.get("high", np.inf) for t in tags], dtype=np.float64)
+    hysteresis = np.array([t.get("hysteresis", 0.0) for t in tags], dtype=np.float64)
+    return low, high, hysteresis
+
+
+class AlarmMonitor:
+    """Alarm state per register for blocks of any shape; limits broadcast against it."""
+
+    def __init__(self, shape, low=-np.inf, high=np.inf, hysteresis=0.0):
+        self.low = np.broadcast_to(np.asarray(low, dtype=np.float64), shape).copy()
+        self.high = np.broadcast_to(np.asarray(high, dtype=np.float64), shape).copy()
+        hysteresis = np.broadcast_to(np.asarray(hysteresis, dtype=np.float64), shape)
+        self.high_clear = self.high - hysteresis
+        self.low_clear = self.low + hysteresis
+        self.state = np.full(shape, NORMAL, dtype=np.int8)
+
+    def update(self, values, timestamp):
+        """[(position, new state, old state, value)] for every register whose state changed."""
+        values = np.asarray(values, dtype=np.float64)
+        old = self.state
+        new = old.copy()
+        new[((old == HIGH) & (values < self.high_clear)) | ((old == LOW) & (values > self.low_clear))] = NORMAL
+        new[(old != LOW) & (values < self.low)] = LOW
+        new[(old != HIGH) & (values > self.high)] = HIGH
+        index = np.nonzero(new != old)
+        events = [(tuple(int(p) for p in pos) if len(index) > 1 else int(pos[0]), int(new[pos]), int(old[pos]),
+                   float(values[pos]))
+                  for pos in zip(*index)]
+        self.state = new
+        return events
+
+
+def alarm_series(values, low=-np.inf, high=np.inf, hysteresis=0.0):
+    """Transitions of one register's series: (indices, new states, old states).
+
+    Same rules and float64 arithmetic as AlarmMonitor, one sample at a time.
+    """
+    high = float(high)
+    low = float(low)
+    high_clear = float(np.float64(high) - np.float64(hysteresis))
+    low_clear = float(np.float64(low) + np.float64(hysteresis))
+    state = NORMAL
+    index, new_states, old_states = [], [], []
+    for i, v in enumerate(np.asarray(values, dtype=np.float64).tolist()):
+        new = state
+        if (state == HIGH and v < high_clear) or (state == LOW and v > low_clear):
+            new = NORMAL
+        if state != LOW and v < low:
+            new = LOW
+        if state != HIGH and v > high:
+            new = HIGH
+        if new != state:
+            index.append(i)
+            new_states.append(new)
+            old_states.append(state)
+            state = new
+    return np.array(index, dtype=np.intp), np.array(new_states, dtype=np.int8), np.array(old_states, dtype=np.int8)
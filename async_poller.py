@@ -0,0 +1,137 @@
+from pymodbus.client import AsyncModbusSerialClient
+from pymodbus.exceptions import ModbusException
+from datetime import datetime
+import asyncio
+import time
+
+from device_health import HealthMonitor, AsyncHealthClient
+from read_planner import plan_reads, bridge_limit, known_illegal, tighten
+from register_map import OK, ILLEGAL, REJECTED, NO_REPLY, ILLEGAL_ADDRESS
+
+# === CONNECTION SETTINGS ===
+PORT = "COM4"
+BAUDRATE = 9600
+PARITY = "E"
+STOPBITS = 1
+TIMEOUT = 1
+
+# Every drive on the shared RS-485 bus and the registers wanted from it
+# (pymodbus zero-based addresses, as in temp3.py–temp8.py)
+DEVICES = {
+    2: [2097, 2102],
+    4: [2097, 2102],
+    7: [2120, 2121],
+    9: [2120, 2121],
+}
+
+MIN_CYCLE = 0          # Seconds per full pass; 0 = keep the bus busy back-to-back
+
+
+async def try_block_async(client, device_id, address, count):
+    """Async twin of register_map.try_block: (outcome, registers or None)."""
+    try:
+        rr = await client.read_holding_registers(address, count=count, device_id=device_id)
+    except ModbusException:
+        return NO_REPLY, None
+    if rr.isError():
+        return (ILLEGAL if getattr(rr, "exception_code", None) == ILLEGAL_ADDRESS else REJECTED), None
+    return OK, rr.registers
+
+
+async def read_plan_async(client, device_id, plan, wanted=None, illegal=None):
+    """Async twin of read_planner.read_plan; returns {address: raw} (tightens `plan` in place)."""
+    values = {}
+    index = 0
+    while index < len(plan):
+        start, count = plan[index]
+        outcome, regs = await try_block_async(client, device_id, start, count)
+        if outcome == OK:
+            values.update(zip(range(start, start + count), regs))
+        elif outcome == ILLEGAL and tighten(plan, index, wanted, illegal):
+            continue
+        index += 1
+    return values
+
+
+class BusPoller:
+    """Polls every configured device over one shared async serial client.
+
+    Devices are read one after another with no sleep in between (the bus only
+    carries one transaction at a time), while other asyncio tasks keep running
+    whenever a frame is in flight. on_sample(device_id, timestamp, values) is
+    called after each device read.
+    """
+
+    def __init__(self, client, devices, on_sample=None, min_cycle=MIN_CYCLE,
+                 baud=BAUDRATE, parity=PARITY, stop=STOPBITS):
+        self.client = client
+        self.wanted = {dev: sorted(addrs) for dev, addrs in devices.items()}
+        max_gap = bridge_limit(baud, parity, stop)
+        self.illegal = known_illegal()
+        self.plans = {dev: plan_reads(addrs, max_gap=max_gap, illegal=self.illegal)
+                      for dev, addrs in self.wanted.items()}
+        self.on_sample = on_sample or print_sample
+        self.min_cycle = min_cycle
+        self.cycles = 0
+        self.last_cycle_time = 0.0
+        self._stopping = False
+
+    async def poll_device(self, device_id):
+        wanted = self.wanted[device_id]
+        values = await read_plan_async(self.client, device_id, self.plans[device_id], wanted, self.illegal)
+        values = {addr: values[addr] for addr in wanted if addr in values}
+        self.on_sample(device_id, time.time(), values)
+        return values
+
+    async def run(self):
+        while not self._stopping:
+            started = time.monotonic()
+            for device_id in self.plans:
+                await self.poll_device(device_id)
+            self.cycles += 1
+            self.last_cycle_time = time.monotonic() - started
+            # Yield at least once per cycle so other tasks are never starved
+            await asyncio.sleep(max(0.0, self.min_cycle - self.last_cycle_time))
+
+    def stop(self):
+        self._stopping = True
+
+
+def print_sample(device_id, timestamp, values):
+    stamp = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+    if not values:
+        print(f"[{stamp}] ⚠️ ID {device_id}: Modbus read error.")
+        return
+    regs = "  ".join(f"{addr}={raw:5d}" for addr, raw in sorted(values.items()))
+    print(f"[{stamp}] ID {device_id}: {regs}")
+
+
+async def main():
+    client = AsyncModbusSerialClient(
+        port=PORT,
+        baudrate=BAUDRATE,
+        parity=PARITY,
+        stopbits=STOPBITS,
+        bytesize=8,
+        timeout=TIMEOUT,
+    )
+
+    print("🔌 Connecting to shared RS-485 bus...")
+    if not await client.connect():
+        print("❌ Connection failed.")
+        return
+
+    print(f"✅ Connected. Polling devices {', '.join(str(d) for d in DEVICES)} back-to-back...\n")
+    # A powered-off drive is quarantined instead of costing a timeout on every read
+    poller = BusPoller(AsyncHealthClient(client, HealthMonitor(DEVICES)), DEVICES)
+    try:
+        await poller.run()
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🔚 Stopped by user.")
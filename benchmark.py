@@ -0,0 +1,229 @@
+from pymodbus.client import ModbusSerialClient
+from datetime import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import modbus_auto_detect
+from bus_stats import BusStats, InstrumentedClient
+from fuji_simulator import Simulator, SimSlave, AMBIENT_M49, LAYOUT
+from read_planner import plan_reads, read_plan, bridge_limit
+from register_map import map_registers
+
+# Discovery, register-scan and polling benchmarks against fuji_simulator.py (Linux/macOS, no hardware).
+#
+#   python benchmark.py                       # run, write benchmark_results/<time>-<rev>.json
+#   python benchmark.py compare OLD.json NEW.json
+#
+# Every (baud, latency, devices) combination below gets its own simulator.
+
+# === BENCHMARK SETTINGS ===
+BAUDS = [9600, 19200]
+LATENCIES = [0.01, 0.05]           # Simulated slave turnaround (s)
+DEVICE_COUNTS = [1, 4]             # Slaves on the simulated bus (IDs 1..n)
+PARITY = "N"                       # Ptys cannot carry parity (see fuji_simulator.py)
+STOPBITS = 1
+
+SCAN_START = 2000                  # detect_registers.py-style full-range scan
+SCAN_END = 2300
+SCAN_BLOCK = 120
+
+POLL_WANTED = [2097, 2102, 2999, 3004]   # temp11.py: Temp, RH, M49, M54
+POLL_CYCLES = 20
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results")
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def simulated_bus(baud, latency, devices):
+    slaves = [SimSlave(device_id, waves=AMBIENT_M49, latency=latency) for device_id in range(1, devices + 1)]
+    return Simulator(slaves, baud=baud, parity=PARITY, stop=STOPBITS).start()
+
+
+def layout_illegal(layout=LAYOUT):
+    """[start, end) gaps between the simulator's readable windows (what a register map would hold)."""
+    valid = sorted((g * 256 + lo, g * 256 + hi) for g, lo, hi in layout)
+    return [(hi, lo) for (_, hi), (lo, _) in zip(valid, valid[1:]) if hi < lo]
+
+
+def open_client(port, baud):
+    client = ModbusSerialClient(port=port, baudrate=baud, bytesize=8, parity=PARITY, stopbits=STOPBITS, timeout=1)
+    if not client.connect():
+        raise RuntimeError(f"Cannot open simulator port {port}")
+    return client
+
+
+def bench_detect(sim, baud, devices):
+    """modbus_auto_detect.scan_port: cold sweep, then with the settings cached."""
+    saved = modbus_auto_detect.parities
+    modbus_auto_detect.parities = [PARITY]     # The other parities cannot be opened on a pty
+    try:
+        start = time.perf_counter()
+        cold = modbus_auto_detect.scan_port(sim.port)
+        cold_s = time.perf_counter() - start
+
+        cache = {}
+        if cold:
+            modbus_auto_detect.discovery_cache.record(cache, sim.port, cold.baud, cold.parity, cold.stop,
+                                                      cold.device_ids)
+        start = time.perf_counter()
+        warm = modbus_auto_detect.scan_port(sim.port, cache)
+        warm_s = time.perf_counter() - start
+    finally:
+        modbus_auto_detect.parities = saved
+
+    expected = list(range(1, devices + 1))
+    return {
+        "cold_s": cold_s,
+        "warm_s": warm_s,
+        "found": bool(cold and cold.baud == baud and cold.device_ids == expected),
+        "found_cached": bool(warm and warm.device_ids == expected),
+    }
+
+
+def bench_scan(sim, baud):
+    """register_map.map_registers over SCAN_START..SCAN_END (detect_registers.py)."""
+    client = open_client(sim.port, baud)
+    try:
+        start = time.perf_counter()
+        ranges, values, transactions = map_registers(client, 1, SCAN_START, SCAN_END, SCAN_BLOCK)
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+    return {
+        "elapsed_s": elapsed,
+        "transactions": transactions,
+        "registers": len(values),
+        "registers_per_s": len(values) / elapsed,
+        "ranges": ranges,
+    }
+
+
+def bench_poll(sim, baud, devices):
+    """temp11.py-style cycles: every device read with the planned blocks; per-cycle latency."""
+    plan = plan_reads(POLL_WANTED, max_gap=bridge_limit(baud, PARITY, STOPBITS), illegal=layout_illegal())
+    stats = BusStats(baud, PARITY, STOPBITS)
+    client = InstrumentedClient(open_client(sim.port, baud), stats)
+    cycles = []
+    incomplete = 0
+    try:
+        stats.reset()
+        for _ in range(POLL_CYCLES):
+            start = time.perf_counter()
+            for device_id in range(1, devices + 1):
+                values = read_plan(client, device_id, plan, POLL_WANTED)
+                incomplete += any(a not in values for a in POLL_WANTED)
+            cycles.append(time.perf_counter() - start)
+    finally:
+        client.close()
+    snapshot = stats.snapshot()
+    transactions = sum(t["count"] for t in snapshot["transactions"].values())
+    cycles = np.array(cycles)
+    return {
+        "plan": plan,
+        "cycle_avg_s": float(cycles.mean()),
+        "cycle_p50_s": float(np.percentile(cycles, 50)),
+        "cycle_p95_s": float(np.percentile(cycles, 95)),
+        "cycle_max_s": float(cycles.max()),
+        "transactions_per_s": transactions / snapshot["elapsed"],
+        "utilization": snapshot["utilization"],
+        "wire_utilization": snapshot["wire_utilization"],
+        "incomplete_reads": incomplete,
+    }
+
+
+def run_all():
+    results = []
+    for baud in BAUDS:
+        for latency in LATENCIES:
+            for devices in DEVICE_COUNTS:
+                sim = simulated_bus(baud, latency, devices)
+                try:
+                    key = {"baud": baud, "latency": latency, "devices": devices}
+                    print(f"⏱️  {baud} bps, {latency * 1000:.0f} ms turnaround, {devices} device(s)")
+                    r = bench_detect(sim, baud, devices)
+                    print(f"   detect: {r['cold_s']:.2f} s cold, {r['warm_s']:.2f} s cached"
+                          f"{'' if r['found'] and r['found_cached'] else '  ❌ wrong result'}")
+                    results.append({"bench": "detect", **key, **r})
+                    if devices == DEVICE_COUNTS[0]:
+                        # The scan only involves one slave; run it once per line setting
+                        r = bench_scan(sim, baud)
+                        print(f"   scan:   {r['elapsed_s']:.2f} s, {r['transactions']} transactions, "
+                              f"{r['registers_per_s']:.0f} registers/s")
+                        results.append({"bench": "scan", "baud": baud, "latency": latency, **r})
+                    r = bench_poll(sim, baud, devices)
+                    print(f"   poll:   cycle p50 {r['cycle_p50_s'] * 1000:.0f} ms, p95 {r['cycle_p95_s'] * 1000:.0f} ms, "
+                          f"{r['transactions_per_s']:.1f} tx/s, bus busy {r['utilization']:.0%}")
+                    results.append({"bench": "poll", **key, **r})
+                finally:
+                    sim.stop()
+    return results
+
+
+def write_results(results):
+    revision = git_revision()
+    report = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "bauds": BAUDS, "latencies": LATENCIES, "device_counts": DEVICE_COUNTS,
+            "parity": PARITY, "stopbits": STOPBITS,
+            "scan": [SCAN_START, SCAN_END, SCAN_BLOCK], "poll_wanted": POLL_WANTED, "poll_cycles": POLL_CYCLES,
+        },
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{revision or 'norev'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+# Headline metric per benchmark (lower is better)
+HEADLINE = {"detect": "cold_s", "scan": "elapsed_s", "poll": "cycle_p50_s"}
+
+
+def compare(old_path, new_path):
+    """Print the headline metric of every matching run in two result files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    def keyed(report):
+        return {(r["bench"], r["baud"], r["latency"], r.get("devices")): r for r in report["results"]}
+
+    before = keyed(old)
+    print(f"📊 {old.get('revision')} → {new.get('revision')}")
+    for key, r in keyed(new).items():
+        if key not in before:
+            continue
+        bench, baud, latency, devices = key
+        metric = HEADLINE[bench]
+        a, b = before[key][metric], r[metric]
+        change = (b - a) / a if a else 0.0
+        label = f"{bench:6} {baud:>6} bps {latency * 1000:3.0f} ms" + (f" {devices} dev" if devices else "")
+        print(f"   {label:32} {metric:12} {a:8.3f} → {b:8.3f}  ({change:+.0%})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        results = run_all()
+        print(f"\n💾 Results written to {write_results(results)}")
@@ -0,0 +1,290 @@
+from pymodbus.exceptions import ModbusException, ModbusIOException
+from array import array
+import ast
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from alarms import alarm_series, tag_limits, STATE_NAMES
+from change_detect import change_series
+from decode import register_count
+from profiles import load_profiles, compile_profiles, PROFILE_FILE
+from scaling import ScalingTable
+
+# Records every register read (device, address, raw registers, timestamp) to a
+# compact binary file, and replays captures through scaling, change detection
+# and alarms at CPU speed:
+#
+#   client = CaptureClient(client, CaptureWriter("session.mbc"))     # AsyncCaptureClient for async
+#   python bus_capture.py replay session.mbc [devices.json]
+#   python bus_capture.py replay temp2.mbc temp2.py      # with the script's own ID, registers and deadband
+#
+# File layout: 32-byte header (magic, wall-clock and monotonic origin), then
+# chunks of up to CHUNK_RECORDS transactions. Each chunk is a record table
+# (RECORD_DTYPE) followed by the registers of its successful reads, so a
+# whole capture loads with a handful of np.frombuffer calls.
+
+MAGIC = b"MBCAP\x00\x01\x00"
+FILE_HEADER = struct.Struct("<8sdd8x")         # magic, wall-clock origin, monotonic origin
+CHUNK_HEADER = struct.Struct("<2sxxII")        # b"CH", records, registers
+CHUNK_RECORDS = 4096
+FLUSH_EVERY = 10.0     # Seconds; at most this much capture is lost if the process dies
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),          # Monotonic time the reply was in
+    ("device", "u1"),
+    ("function", "u1"),
+    ("status", "u1"),
+    ("code", "u1"),        # Modbus exception code
+    ("address", "<u2"),
+    ("count", "<u2"),
+])
+
+# --- Record status ---
+OK, EXCEPTION, NO_RESPONSE = 0, 1, 2
+
+DEADBAND = 0.0         # Replay default when a tag sets no "deadband"
+
+
+class CaptureWriter:
+    """Appends transactions to a capture file, one chunk at a time."""
+
+    def __init__(self, path, chunk=CHUNK_RECORDS, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.f = open(path, "wb")
+        self.f.write(FILE_HEADER.pack(MAGIC, time.time(), time.monotonic()))
+        self.records = np.zeros(chunk, dtype=RECORD_DTYPE)
+        self.registers = array("H")
+        self.n = 0
+        self.flush_every = flush_every
+        self.last_flush = time.monotonic()
+        self.total = 0
+
+    def record(self, device_id, function, address, count, status=OK, code=0, registers=(), t=None):
+        t = time.monotonic() if t is None else t
+        self.records[self.n] = (t, device_id, function, status, code, address, count)
+        if status == OK:
+            self.registers.extend(registers)
+        self.n += 1
+        self.total += 1
+        if self.n == len(self.records) or t - self.last_flush >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.n:
+            regs = np.frombuffer(self.registers, dtype=np.uint16).astype("<u2", copy=False)
+            self.f.write(CHUNK_HEADER.pack(b"CH", self.n, len(regs)))
+            self.f.write(self.records[:self.n].tobytes())
+            self.f.write(regs.tobytes())
+            self.n = 0
+            self.registers = array("H")
+        self.f.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+
+class Capture:
+    """A loaded capture: records (with wall-clock 't') and every register read, flat."""
+
+    def __init__(self, records, registers, offsets):
+        self.records = records
+        self.registers = registers
+        self.offsets = offsets       # Index of each record's first register (successful reads)
+
+    def __len__(self):
+        return len(self.records)
+
+    def series(self, device_id, addresses):
+        """(t, raw) for the reads of device_id that returned any of the addresses.
+
+        raw is (n, len(addresses)) float64 with NaN where a read did not cover
+        an address — one row per read, in capture order.
+        """
+        rec = self.records
+        mine = np.nonzero((rec["device"] == device_id) & (rec["status"] == OK) & (rec["function"] == 3))[0]
+        start = rec["address"][mine].astype(np.int64)
+        end = start + rec["count"][mine]
+        raw = np.full((len(mine), len(addresses)), np.nan)
+        for j, address in enumerate(addresses):
+            inside = (start <= address) & (address < end)
+            raw[inside, j] = self.registers[self.offsets[mine[inside]] + (address - start[inside])]
+        covered = ~np.isnan(raw).all(axis=1)
+        return rec["t"][mine[covered]], raw[covered]
+
+
+def load_capture(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, wall0, mono0 = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a bus capture")
+    records, registers = [], []
+    pos = FILE_HEADER.size
+    while pos + CHUNK_HEADER.size <= len(data):
+        tag, n, n_regs = CHUNK_HEADER.unpack_from(data, pos)
+        pos += CHUNK_HEADER.size
+        end = pos + n * RECORD_DTYPE.itemsize + 2 * n_regs
+        if tag != b"CH" or end > len(data):
+            break                    # Truncated last chunk (writer killed mid-write)
+        records.append(np.frombuffer(data, RECORD_DTYPE, n, pos))
+        registers.append(np.frombuffer(data, "<u2", n_regs, pos + n * RECORD_DTYPE.itemsize))
+        pos = end
+    records = np.concatenate(records) if records else np.zeros(0, RECORD_DTYPE)
+    registers = np.concatenate(registers) if registers else np.zeros(0, np.uint16)
+    records["t"] += wall0 - mono0    # Monotonic -> Unix time
+    counts = np.where(records["status"] == OK, records["count"], 0).astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+    return Capture(records, registers.astype(np.uint16), offsets)
+
+
+class CaptureClient:
+    """Wraps a sync pymodbus client and writes every register read to a CaptureWriter."""
+
+    def __init__(self, client, writer):
+        self.client = client
+        self.writer = writer
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _log(self, function, address, count, device_id, rr=None, failed=False):
+        if failed:
+            self.writer.record(device_id, function, address, count, NO_RESPONSE)
+        elif rr.isError():
+            self.writer.record(device_id, function, address, count, EXCEPTION, getattr(rr, "exception_code", 0) or 0)
+        else:
+            registers = rr.registers[:count]
+            self.writer.record(device_id, function, address, len(registers), OK, registers=registers)
+
+    def read_holding_registers(self, address, *, count=1, device_id=1, **kwargs):
+        try:
+            rr = self.client.read_holding_registers(address, count=count, device_id=device_id, **kwargs)
+        except ModbusException as e:
+            if isinstance(e, ModbusIOException):
+                self._log(3, address, count, device_id, failed=True)
+            raise
+        self._log(3, address, count, device_id, rr)
+        return rr
+
+    def close(self):
+        self.writer.close()
+        return self.client.close()
+
+
+class AsyncCaptureClient(CaptureClient):
+    """CaptureClient for AsyncModbusSerialClient / AsyncModbusTcpClient."""
+
+    async def read_holding_registers(self, address, *, count=1, device_id=1, **kwargs):
+        try:
+            rr = await self.client.read_holding_registers(address, count=count, device_id=device_id, **kwargs)
+        except ModbusException as e:
+            if isinstance(e, ModbusIOException):
+                self._log(3, address, count, device_id, failed=True)
+            raise
+        self._log(3, address, count, device_id, rr)
+        return rr
+
+
+def script_profile(path):
+    """Profile for a single-drive script in the style of temp2.py, read from its settings.
+
+    Only the top-level constants are parsed (the script is not run): SLAVE_ID,
+    START_ADDR and NUM_REGS give one raw tag per register, DEADBAND (one value
+    or one per register) its change deadband. As in the script's
+    ChangeDetector(report_first=False), the first sample is compared with 0
+    and reported only if it is further from 0 than the deadband.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    settings = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                settings[node.targets[0].id] = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+    missing = [k for k in ("SLAVE_ID", "START_ADDR", "NUM_REGS") if k not in settings]
+    if missing:
+        raise ValueError(f"{path} does not set {', '.join(missing)}")
+    start, n = settings["START_ADDR"], settings["NUM_REGS"]
+    deadband = settings.get("DEADBAND", DEADBAND)
+    deadbands = list(deadband) if isinstance(deadband, (list, tuple)) else [deadband] * n
+    name = os.path.splitext(os.path.basename(path))[0]
+    tags = [{"name": f"reg_{start + i}", "address": start + i, "format": "raw",
+             "deadband": deadbands[i], "report_first": False} for i in range(n)]
+    return {"port": settings.get("PORT", ""), "baudrate": settings.get("BAUDRATE", 9600),
+            "devices": [{"id": settings["SLAVE_ID"], "name": name, "tags": tags}]}
+
+
+def replay(capture, devices, deadband=DEADBAND):
+    """Run a capture through each tag's scaling, change detection and alarms.
+
+    Every stage works per register, so each tag is processed as one series.
+    Scaling and alarms use the same rules and arithmetic as acquire.py
+    (ScalingTable, AlarmMonitor). acquire.py has no change-detection stage:
+    changes follow ChangeDetector as the single-drive scripts use it (temp2.py,
+    see script_profile), with each tag's "deadband", "percent" and "report_first".
+    Returns {(device_id, tag): result dict}.
+    """
+    results = {}
+    for dev in devices:
+        spans = [range(t["address"], t["address"] + register_count(t)) for t in dev.tags]
+        addresses = sorted({a for span in spans for a in span})
+        column = {a: j for j, a in enumerate(addresses)}
+        t, raw = capture.series(dev.device_id, addresses)
+        low, high, hysteresis = tag_limits(dev.tags)
+        for j, tag in enumerate(dev.tags):
+            words = raw[:, [column[a] for a in spans[j]]]
+            have = ~np.isnan(words).any(axis=1)
+            times = t[have]
+            values = ScalingTable([tag]).convert(words[have].astype(np.uint16))[:, 0]
+            ch_index, ch_values, ch_previous = change_series(values, tag.get("deadband", deadband),
+                                                             tag.get("percent", 0.0),
+                                                             tag.get("report_first", True))
+            al_index, al_new, al_old = alarm_series(values, low[j], high[j], hysteresis[j])
+            results[(dev.device_id, tag["name"])] = {
+                "t": times,
+                "values": values,
+                "changes": (times[ch_index], ch_values, ch_previous),
+                "alarms": (times[al_index], al_new, al_old, values[al_index]),
+            }
+    return results
+
+
+def main_replay(path, profile=PROFILE_FILE):
+    """Replay with a devices.json-style profile, or the settings of the script (.py) that recorded it."""
+    started = time.perf_counter()
+    capture = load_capture(path)
+    loaded = time.perf_counter()
+    config = script_profile(profile) if profile.endswith(".py") else load_profiles(profile)
+    devices = compile_profiles(config)
+    results = replay(capture, devices)
+    done = time.perf_counter()
+
+    span = (capture.records["t"][-1] - capture.records["t"][0]) if len(capture) else 0.0
+    print(f"📼 {path}: {len(capture)} transactions over {span / 3600:.1f} h")
+    print(f"   loaded in {loaded - started:.2f} s, replayed in {done - loaded:.2f} s\n")
+    for (device_id, name), r in results.items():
+        values = r["values"]
+        summary = f"{values.min():8.2f} .. {values.max():8.2f}" if len(values) else "     no samples"
+        print(f"   ID {device_id:>3} {name:<16} {len(values):7d} samples  {summary}  "
+              f"{len(r['changes'][0]):6d} changes  {len(r['alarms'][0]):4d} alarm transitions")
+        for ts, new, old, value in zip(*[a.tolist() for a in r["alarms"]]):
+            print(f"      {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}  "
+                  f"{STATE_NAMES[old]} → {STATE_NAMES[new]} at {value:.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (3, 4) and sys.argv[1] == "replay":
+        main_replay(*sys.argv[2:])
+    else:
+        print("Usage: python bus_capture.py replay CAPTURE.mbc [devices.json | temp2.py]")
+        print("       (record with capture_dir in devices.json, or CAPTURE_FILE in temp2.py)")
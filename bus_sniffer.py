@@ -0,0 +1,322 @@
+from collections import namedtuple
+import sys
+import time
+
+import serial  # pyserial (installed with pymodbus[serial])
+
+from modbus_rtu import crc16, frame_gap, USB_LATENCY
+import discovery_cache
+import modbus_auto_detect
+
+# Listen-only alternative to the modbus_auto_detect.py sweep: nothing is ever
+# transmitted, so it is safe on a live bus that already has a master.
+#
+#   python bus_sniffer.py [PORT ...]
+#
+# For each candidate baud/parity the port is opened and the traffic is cut
+# into frames by silence and CRC. The right settings give back-to-back valid
+# frames within a few polls; wrong ones give garbage and are dropped after
+# REJECT_BYTES. Once locked, requests are paired with replies to list the
+# slaves that answer and every register block the master polls.
+#
+# Stop bits cannot be heard (a receiver only checks the first one); the
+# result keeps the cached value for these settings, else 1.
+
+# === SNIFFER SETTINGS ===
+PORTS = modbus_auto_detect.PORTS
+BAUDS = modbus_auto_detect.baud_rates
+PARITIES = modbus_auto_detect.parities
+LISTEN = 3.0           # Longest wait per candidate setting (must cover a poll cycle of the master)
+LEARN = 5.0            # Seconds of traffic logged after locking on, for IDs and polled registers
+SETTLE_FRAMES = 4      # Valid frames in a row that lock the settings
+REJECT_BYTES = 48      # Garbage with no valid frame after this many bytes: wrong settings
+MIN_SCORE = 0.5        # Share of bytes in valid frames for a candidate that never settled
+READ_TIMEOUT = 0.005
+
+# --- Frame directions ---
+REQUEST = "request"
+RESPONSE = "response"
+
+SniffResult = namedtuple("SniffResult", ["port", "baud", "parity", "stop", "device_ids", "silent_ids",
+                                         "polls", "score", "frames"])
+
+
+def frame_lengths(buf, p):
+    """Possible RTU frame lengths starting at buf[p] (request and response forms)."""
+    n = len(buf) - p
+    if n < 4 or buf[p] > 247:
+        return ()
+    fc = buf[p + 1]
+    if fc & 0x80:
+        return (5,) if 1 <= fc & 0x7F <= 24 else ()
+    if fc in (1, 2, 3, 4):
+        return (8, 5 + buf[p + 2])
+    if fc in (5, 6):
+        return (8,)
+    if fc in (15, 16):
+        return (8, 9 + buf[p + 6]) if n >= 7 else (8,)
+    return ()
+
+
+def split_frames(buf):
+    """Cut one burst of bytes into CRC-valid frames; returns (frames, garbage byte count)."""
+    frames = []
+    garbage = 0
+    p = 0
+    while p < len(buf):
+        for length in frame_lengths(buf, p):
+            if p + length <= len(buf) and crc16(buf[p:p + length]) == 0:
+                frames.append(bytes(buf[p:p + length]))
+                p += length
+                break
+        else:
+            garbage += 1
+            p += 1
+    return frames, garbage
+
+
+def reply_bytes(request):
+    """Data byte count of the reply to an FC1-4 read request."""
+    count = int.from_bytes(request[4:6], "big")
+    return 2 * count if request[1] in (3, 4) else (count + 7) // 8
+
+
+def classify(frame, pending=None):
+    """(direction, device_id, function, address, count) of a valid frame.
+
+    FC5/6 requests and replies are identical; an echo of the pending request
+    is taken as its reply. An FC1/FC2 reply with 3 data bytes is 8 bytes long
+    like a read request; it is a reply when a read of the same ID and function
+    is pending and frame[2] is the byte count that read expects. FC3/FC4
+    replies have an even byte count, so an 8-byte FC3/FC4 frame is a request.
+    """
+    device_id, fc = frame[0], frame[1]
+    if fc & 0x80:
+        return RESPONSE, device_id, fc, None, None
+    if fc in (1, 2, 3, 4):
+        if len(frame) == 8 and not (fc in (1, 2) and pending and pending != frame and pending[0] == device_id
+                                    and pending[1] == fc and frame[2] == reply_bytes(pending)):
+            return REQUEST, device_id, fc, int.from_bytes(frame[2:4], "big"), int.from_bytes(frame[4:6], "big")
+        return RESPONSE, device_id, fc, None, None
+    address = int.from_bytes(frame[2:4], "big")
+    if fc in (5, 6):
+        direction = RESPONSE if pending == frame else REQUEST
+        return direction, device_id, fc, address, 1
+    if len(frame) == 8:
+        return RESPONSE, device_id, fc, address, int.from_bytes(frame[4:6], "big")
+    return REQUEST, device_id, fc, address, int.from_bytes(frame[4:6], "big")
+
+
+class Traffic:
+    """Pairs requests with replies: which IDs answer and what the master asks for."""
+
+    def __init__(self):
+        self.pending = None          # (frame, device_id, function) of the last unanswered request
+        self.answers = {}            # device_id -> replies (data or exception)
+        self.exceptions = {}
+        self.unanswered = {}         # device_id -> requests that got no reply
+        self.polls = {}              # (device_id, function, address, count) -> [count, first t, last t]
+
+    def add(self, frame, t):
+        direction, device_id, fc, address, count = classify(frame, self.pending and self.pending[0])
+        if direction == REQUEST:
+            self._close_pending()
+            if device_id:            # ID 0 is a broadcast, never answered
+                self.pending = (frame, device_id, fc)
+            key = (device_id, fc, address, count)
+            entry = self.polls.get(key)
+            if entry is None:
+                self.polls[key] = [1, t, t]
+            else:
+                entry[0] += 1
+                entry[2] = t
+        elif self.pending and self.pending[1] == device_id and self.pending[2] == fc & 0x7F:
+            self.answers[device_id] = self.answers.get(device_id, 0) + 1
+            if fc & 0x80:
+                self.exceptions[device_id] = self.exceptions.get(device_id, 0) + 1
+            self.pending = None
+
+    def _close_pending(self):
+        if self.pending:
+            device_id = self.pending[1]
+            self.unanswered[device_id] = self.unanswered.get(device_id, 0) + 1
+        self.pending = None
+
+    def device_ids(self):
+        return sorted(self.answers)
+
+    def silent_ids(self):
+        return sorted(d for d in self.unanswered if d not in self.answers)
+
+    def poll_table(self):
+        """[(device_id, function, address, count, polls, period s or None)] sorted by ID and address."""
+        rows = []
+        for (device_id, fc, address, count), (n, first, last) in self.polls.items():
+            rows.append((device_id, fc, address, count, n, (last - first) / (n - 1) if n > 1 else None))
+        return sorted(rows)
+
+
+class Sniffer:
+    """Scores one candidate line setting from timestamped chunks of received bytes."""
+
+    def __init__(self, baud, parity="N", stop=1):
+        self.baud = baud
+        self.parity = parity
+        self.stop = stop
+        self.silence = max(2 * frame_gap(baud, parity, stop), USB_LATENCY)
+        self.burst = bytearray()
+        self.burst_start = self.last = None
+        self.bytes = 0
+        self.valid_bytes = 0
+        self.frames = 0
+        self.in_a_row = 0
+        self.traffic = Traffic()
+
+    def feed(self, t, data):
+        if self.last is not None and t - self.last > self.silence:
+            self.flush()
+        if not self.burst:
+            self.burst_start = t
+        self.burst += data
+        self.last = t
+
+    def flush(self):
+        """Parse the burst collected so far (frames never span a silence)."""
+        if not self.burst:
+            return
+        frames, garbage = split_frames(self.burst)
+        self.bytes += len(self.burst)
+        self.valid_bytes += len(self.burst) - garbage
+        self.frames += len(frames)
+        self.in_a_row = 0 if garbage and not frames else self.in_a_row + len(frames)
+        for frame in frames:
+            self.traffic.add(frame, self.burst_start)
+        self.burst = bytearray()
+
+    @property
+    def score(self):
+        return self.valid_bytes / self.bytes if self.bytes else 0.0
+
+    def settled(self):
+        return self.in_a_row >= SETTLE_FRAMES
+
+    def rejected(self):
+        return self.bytes >= REJECT_BYTES and self.frames == 0
+
+
+def _check_parity(ser):
+    """Drop bytes with parity errors (pyserial leaves parity unchecked), so E and O score apart."""
+    try:
+        import termios
+    except ImportError:
+        return                       # Windows: parity E and O may tie; E is listed first
+    try:
+        attrs = termios.tcgetattr(ser.fd)
+        attrs[0] |= termios.INPCK | termios.IGNPAR
+        termios.tcsetattr(ser.fd, termios.TCSANOW, attrs)
+    except termios.error:
+        pass
+
+
+def listen(ser, sniffer, seconds, until_settled=True):
+    """Feed the port's traffic to the sniffer for up to `seconds`."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        data = ser.read(max(1, ser.in_waiting))
+        now = time.monotonic()
+        if data:
+            sniffer.feed(now, data)
+        elif sniffer.last is not None and now - sniffer.last > sniffer.silence:
+            sniffer.flush()
+        if until_settled and (sniffer.settled() or sniffer.rejected()):
+            break
+    sniffer.flush()
+    return sniffer
+
+
+def candidates(port, cache):
+    """(baud, parity) pairs: last known-good first, then by past hits, then the sweep order."""
+    default = (modbus_auto_detect.default_settings["baud"], modbus_auto_detect.default_settings["parity"], 1)
+    combos = [default] + [(baud, parity, 1) for baud in BAUDS for parity in PARITIES]
+    combos = discovery_cache.order_by_hits(cache, port, combos)
+    last = discovery_cache.last_settings(cache, port)
+    if last:
+        combos.insert(0, (last[0], last[1], 1))
+    seen = []
+    for baud, parity, _ in combos:
+        if (baud, parity) not in seen:
+            seen.append((baud, parity))
+    return seen
+
+
+def open_listener(port, baud, parity):
+    ser = serial.Serial(port=port, baudrate=baud, parity=parity, stopbits=1, bytesize=8, timeout=READ_TIMEOUT)
+    if parity != "N":
+        _check_parity(ser)
+    ser.reset_input_buffer()
+    return ser
+
+
+def sniff_port(port, cache=None, listen_for=LISTEN, learn=LEARN):
+    """Find the line settings on a port by listening only; returns a SniffResult or None."""
+    cache = cache or {}
+    best = None
+    for baud, parity in candidates(port, cache):
+        try:
+            ser = open_listener(port, baud, parity)
+        except serial.SerialException:
+            continue
+        try:
+            sniffer = listen(ser, Sniffer(baud, parity), listen_for)
+            if sniffer.settled():
+                listen(ser, sniffer, learn, until_settled=False)
+                best = sniffer
+                break
+        finally:
+            ser.close()
+        if sniffer.frames >= 2 and sniffer.score >= MIN_SCORE and (best is None or sniffer.score > best.score):
+            best = sniffer
+    if best is None:
+        return None
+
+    last = discovery_cache.last_settings(cache, port)
+    stop = last[2] if last and (last[0], last[1]) == (best.baud, best.parity) else 1
+    traffic = best.traffic
+    return SniffResult(port, best.baud, best.parity, stop, traffic.device_ids(), traffic.silent_ids(),
+                       traffic.poll_table(), best.score, best.frames)
+
+
+def print_result(r):
+    print(f"\n✅ Traffic decoded on {r.port}: {r.frames} frames, {r.score:.0%} of bytes in valid frames")
+    print(f"   Baud Rate : {r.baud}")
+    print(f"   Parity    : {r.parity}")
+    print(f"   Stop Bits : {r.stop} (not detectable by listening)")
+    print(f"   Device IDs: {', '.join(str(i) for i in r.device_ids) or '-'}")
+    if r.silent_ids:
+        print(f"   ⚠️ Polled but silent: {', '.join(str(i) for i in r.silent_ids)}")
+    if r.polls:
+        print("\n   📋 What the master polls:")
+    for device_id, fc, address, count, n, period in r.polls:
+        span = f"{address}" if count == 1 else f"{address}-{address + count - 1}"
+        every = f"every {period:.2f} s" if period else "once"
+        print(f"      ID {device_id:>3} FC{fc:<2} {span:>11} ({count:>3} regs)  {n:4d}× {every}")
+
+
+if __name__ == "__main__":
+    ports = sys.argv[1:] or PORTS
+    print(f"👂 Listening on {', '.join(ports)} (nothing is transmitted)...")
+    cache = discovery_cache.load_cache()
+    started = time.monotonic()
+    found = False
+    for port in ports:
+        result = sniff_port(port, cache)
+        if result is None:
+            print(f"\n❌ No decodable Modbus traffic on {port}. Is a master polling the bus?")
+            continue
+        found = True
+        print_result(result)
+        if result.device_ids:
+            discovery_cache.record(cache, port, result.baud, result.parity, result.stop, result.device_ids)
+    if found:
+        discovery_cache.save_cache(cache)
+    print(f"\n⏱️ Finished in {time.monotonic() - started:.1f} s")
@@ -0,0 +1,275 @@
+from pymodbus.exceptions import ModbusException, ModbusIOException
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+
+from modbus_rtu import char_time
+
+# Per-transaction bus instrumentation. Wrap the client once and keep using it:
+#
+#   stats = BusStats(baud=9600, parity="E", stop=1)
+#   client = InstrumentedClient(client, stats)        # AsyncInstrumentedClient for async clients
+#   ...
+#   print(format_report(stats.snapshot()))
+#
+# Every read/write is counted per (device, function code): latency histogram,
+# bytes on the wire, timeouts, CRC errors and Modbus exception codes.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)   # Upper edges in seconds; last bucket is "more"
+
+# --- Transaction outcomes ---
+OK = "ok"
+TIMEOUT = "timeout"
+CRC_ERROR = "crc"
+EXCEPTION = "exception"      # Slave answered with a Modbus exception code
+ERROR = "error"              # Anything else the client raised
+
+
+class TransactionStats:
+    """Counters and latency histogram for one (device, function code)."""
+
+    def __init__(self):
+        self.count = 0
+        self.ok = 0
+        self.timeouts = 0
+        self.crc_errors = 0
+        self.errors = 0
+        self.exceptions = {}             # exception code -> count
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, latency, sent, received, outcome, code=None):
+        self.count += 1
+        self.bytes_out += sent
+        self.bytes_in += received
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        if outcome == OK:
+            self.ok += 1
+        elif outcome == TIMEOUT:
+            self.timeouts += 1
+        elif outcome == CRC_ERROR:
+            self.crc_errors += 1
+        elif outcome == EXCEPTION:
+            self.exceptions[code] = self.exceptions.get(code, 0) + 1
+        else:
+            self.errors += 1
+
+    def percentile(self, q):
+        """Upper bucket edge below which a fraction q of the latencies fall (inf if in the last bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for edge, n in zip(LATENCY_BUCKETS + (float("inf"),), self.histogram):
+            seen += n
+            if seen >= target:
+                return edge
+        return float("inf")
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "ok": self.ok,
+            "timeouts": self.timeouts,
+            "crc_errors": self.crc_errors,
+            "errors": self.errors,
+            "exceptions": dict(self.exceptions),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "latency_avg": self.latency_sum / self.count if self.count else 0.0,
+            "latency_max": self.latency_max,
+            "latency_p50": self.percentile(0.5),
+            "latency_p95": self.percentile(0.95),
+            "histogram": list(self.histogram),
+        }
+
+
+class BusStats:
+    """All transactions on one bus, keyed by (device_id, function code).
+
+    The line counts as busy from sending a request until its reply is in (or
+    the timeout runs out); utilization is that busy time over wall time. With
+    the line settings given, the pure wire time of the bytes is reported too.
+    record() is thread-safe, so the blocking gateway worker can feed it.
+    """
+
+    def __init__(self, baud=None, parity="E", stop=1, clock=time.monotonic):
+        self.char_time = char_time(baud, parity, stop) if baud else None
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = self.clock()
+            self.busy = 0.0
+            self.table = {}
+
+    def record(self, device_id, function, latency, sent, received, outcome=OK, code=None):
+        with self.lock:
+            key = (device_id, function)
+            entry = self.table.get(key)
+            if entry is None:
+                entry = self.table[key] = TransactionStats()
+            entry.record(latency, sent, received, outcome, code)
+            self.busy += latency
+
+    def snapshot(self):
+        """Plain dict of everything so far (JSON-serialisable)."""
+        with self.lock:
+            elapsed = max(self.clock() - self.started, 1e-9)
+            transactions = {f"{dev}/{fc}": entry.as_dict() for (dev, fc), entry in sorted(self.table.items())}
+            wire_bytes = sum(e.bytes_out + e.bytes_in for e in self.table.values())
+            busy = self.busy
+        snapshot = {
+            "elapsed": elapsed,
+            "busy": busy,
+            "utilization": busy / elapsed,
+            "transactions": transactions,
+        }
+        if self.char_time:
+            snapshot["wire_utilization"] = wire_bytes * self.char_time / elapsed
+        return snapshot
+
+
+def frame_sizes(function, count=1, error=False):
+    """RTU bytes (request, reply) for a read/write of `count` registers or coils."""
+    if function in (1, 2):
+        request, reply = 8, 5 + (count + 7) // 8
+    elif function in (3, 4):
+        request, reply = 8, 5 + 2 * count
+    elif function in (5, 6):
+        request, reply = 8, 8
+    elif function == 16:
+        request, reply = 9 + 2 * count, 8
+    else:
+        request, reply = 8, 8
+    return request, 5 if error else reply
+
+
+def classify(rr):
+    """(outcome, exception code) for a pymodbus response."""
+    if not rr.isError():
+        return OK, None
+    code = getattr(rr, "exception_code", None)
+    return (EXCEPTION, code) if code is not None else (ERROR, None)
+
+
+class InstrumentedClient:
+    """Wraps a sync pymodbus client and records every register read/write in a BusStats.
+
+    pymodbus drops frames with a bad CRC and then reports no response, so
+    through a client CRC errors show up as timeouts; the gateway, which reads
+    the raw frames, tells them apart.
+    """
+
+    def __init__(self, client, stats):
+        self.client = client
+        self.stats = stats
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _call(self, function, n, device_id, method, /, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            rr = method(*args, device_id=device_id, **kwargs)
+        except ModbusException as e:
+            self._record(device_id, function, n, started, TIMEOUT if isinstance(e, ModbusIOException) else ERROR)
+            raise
+        self._record(device_id, function, n, started, *classify(rr))
+        return rr
+
+    def _record(self, device_id, function, count, started, outcome, code=None):
+        sent, received = frame_sizes(function, count, error=outcome == EXCEPTION)
+        if outcome in (TIMEOUT, ERROR):
+            received = 0
+        self.stats.record(device_id, function, time.perf_counter() - started, sent, received, outcome, code)
+
+    def read_coils(self, address, *, count=1, device_id=1, **kwargs):
+        return self._call(1, count, device_id, self.client.read_coils, address, count=count, **kwargs)
+
+    def read_discrete_inputs(self, address, *, count=1, device_id=1, **kwargs):
+        return self._call(2, count, device_id, self.client.read_discrete_inputs, address, count=count, **kwargs)
+
+    def read_holding_registers(self, address, *, count=1, device_id=1, **kwargs):
+        return self._call(3, count, device_id, self.client.read_holding_registers, address, count=count, **kwargs)
+
+    def read_input_registers(self, address, *, count=1, device_id=1, **kwargs):
+        return self._call(4, count, device_id, self.client.read_input_registers, address, count=count, **kwargs)
+
+    def write_register(self, address, value, *, device_id=1, **kwargs):
+        return self._call(6, 1, device_id, self.client.write_register, address, value, **kwargs)
+
+    def write_registers(self, address, values, *, device_id=1, **kwargs):
+        return self._call(16, len(values), device_id, self.client.write_registers, address, values, **kwargs)
+
+
+class AsyncInstrumentedClient(InstrumentedClient):
+    """InstrumentedClient for AsyncModbusSerialClient / AsyncModbusTcpClient."""
+
+    async def _call(self, function, n, device_id, method, /, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            rr = await method(*args, device_id=device_id, **kwargs)
+        except ModbusException as e:
+            self._record(device_id, function, n, started, TIMEOUT if isinstance(e, ModbusIOException) else ERROR)
+            raise
+        self._record(device_id, function, n, started, *classify(rr))
+        return rr
+
+
+def format_report(snapshot):
+    """Human-readable table: one line per device/function, slowest p95 first."""
+    lines = [f"📊 Bus busy {snapshot['utilization']:.0%} of {snapshot['elapsed']:.0f} s"
+             + (f" (wire {snapshot['wire_utilization']:.0%})" if "wire_utilization" in snapshot else "")]
+    rows = sorted(snapshot["transactions"].items(), key=lambda kv: -kv[1]["latency_p95"])
+    for key, t in rows:
+        device_id, function = key.split("/")
+        errors = f"{t['timeouts']} timeout, {t['crc_errors']} crc"
+        if t["exceptions"]:
+            errors += ", exc " + " ".join(f"{code}×{n}" for code, n in sorted(t["exceptions"].items()))
+        lines.append(f"   ID {device_id:>3} FC{function:<2} {t['count']:6d} tx  "
+                     f"avg {t['latency_avg'] * 1000:6.1f} ms  p95 ≤{t['latency_p95'] * 1000:6.0f} ms  "
+                     f"max {t['latency_max'] * 1000:6.1f} ms  {errors}")
+    return "\n".join(lines)
+
+
+def dump(stats, path=None):
+    """Print the report, or write the snapshot as JSON to path (atomically)."""
+    snapshot = stats.snapshot()
+    if path is None:
+        print(format_report(snapshot))
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(snapshot, time=time.time()), f, indent=2)
+    os.replace(tmp, path)
+
+
+async def dump_periodically(stats, period, path=None):
+    """Async task: dump every `period` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(period)
+        dump(stats, path)
+
+
+def start_dump_thread(stats, period, path=None):
+    """Daemon thread dumping every `period` seconds, for the synchronous scripts."""
+    def loop():
+        while True:
+            time.sleep(period)
+            dump(stats, path)
+    thread = threading.Thread(target=loop, name="bus-stats", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,164 @@
+from pymodbus.client import ModbusSerialClient
+import json
+import os
+
+import numpy as np
+
+from register_map import map_registers, read_ranges, NoReply
+
+# === USER SETTINGS ===
+PORT = "COM4"
+BAUDRATE = 9600
+DEVICE_IDS = [9]         # Drives to calibrate in the same session
+START_ADDR = 2000        # Scan window (covers 2097/2102 and 2120/2121)
+NUM_REGS = 400
+BLOCK_SIZE = 120
+QUANTITIES = ["temperature", "humidity"]   # Reference values asked for per sample
+MIN_SAMPLES = 3          # Fit only once this many samples are in
+TOP_N = 5                # Candidates printed per quantity
+MIN_R2 = 0.98            # Fit quality needed to write a register into the calibration
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration.json")
+
+
+def fit_linear(X, Y):
+    """Least-squares y = scale * x + offset for every (register, quantity) pair at once.
+
+    X: (samples, registers) raw values, Y: (samples, quantities) references.
+    Returns scale, offset, r2, rms arrays of shape (registers, quantities).
+    Registers that never changed get NaN.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    n = X.shape[0]
+    dx = X - X.mean(axis=0)
+    dy = Y - Y.mean(axis=0)
+    sxx = np.einsum("ij,ij->j", dx, dx)[:, None]
+    syy = np.einsum("ij,ij->j", dy, dy)[None, :]
+    sxy = dx.T @ dy
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(sxx > 0, sxy / sxx, np.nan)
+        offset = Y.mean(axis=0)[None, :] - scale * X.mean(axis=0)[:, None]
+        r2 = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), np.nan)
+        rms = np.sqrt(np.maximum(syy - scale * sxy, 0.0) / n)
+    return scale, offset, r2, rms
+
+
+def fit_signed_and_unsigned(raw, Y):
+    """Fit each register read as unsigned and as signed 16-bit; keep the better fit.
+
+    Returns scale, offset, r2, rms, signed — all (registers, quantities).
+    """
+    raw = np.asarray(raw, dtype=np.uint16)
+    fits_u = fit_linear(raw, Y)
+    fits_s = fit_linear(raw.view(np.int16), Y)
+    use_signed = np.nan_to_num(fits_s[2], nan=-1) > np.nan_to_num(fits_u[2], nan=-1)
+    merged = [np.where(use_signed, s, u) for u, s in zip(fits_u, fits_s)]
+    return (*merged, use_signed)
+
+
+def rank(addresses, fits, quantity_index, top_n=TOP_N):
+    """Best registers for one quantity, best fit first: list of dicts."""
+    scale, offset, r2, rms, signed = fits
+    q = quantity_index
+    order = np.argsort(-np.nan_to_num(r2[:, q], nan=-1))[:top_n]
+    return [
+        {
+            "address": int(addresses[i]),
+            "format": "factor",
+            "scale": float(scale[i, q]),
+            "offset": float(offset[i, q]),
+            "signed": bool(signed[i, q]),
+            "r2": float(r2[i, q]),
+            "rms": float(rms[i, q]),
+        }
+        for i in order if not np.isnan(r2[i, q])
+    ]
+
+
+if __name__ == "__main__":
+    client = ModbusSerialClient(
+        port=PORT,
+        baudrate=BAUDRATE,
+        bytesize=8,
+        parity='E',
+        stopbits=1,
+        timeout=1
+    )
+
+    print("🔌 Checking Modbus connection...")
+    if not client.connect():
+        print("❌ Connection failed. Check COM port & wiring.")
+        raise SystemExit(1)
+
+    # Learn each drive's readable registers once; every sample then reads the same columns
+    print(f"🔍 Mapping registers {START_ADDR}-{START_ADDR + NUM_REGS - 1} on devices {DEVICE_IDS}...")
+    layout = {}
+    for device_id in DEVICE_IDS:
+        try:
+            ranges, values, _ = map_registers(client, device_id, START_ADDR, START_ADDR + NUM_REGS, BLOCK_SIZE)
+        except NoReply:
+            print(f"   ID {device_id}: no answer, skipped")
+            continue
+        layout[device_id] = (ranges, np.array(sorted(values)))
+        print(f"   ID {device_id}: {len(values)} readable registers")
+
+    samples = {device_id: [] for device_id in DEVICE_IDS}
+    references = []
+    print("\nTake readings at different operating points — the fit needs the reference to vary.\n")
+
+    while True:
+        try:
+            ref = [float(input(f"Enter current {q} from VFD display: ")) for q in QUANTITIES]
+            rows = {}
+            for device_id, (ranges, addrs) in layout.items():
+                try:
+                    data = read_ranges(client, device_id, ranges, BLOCK_SIZE)
+                except NoReply:
+                    continue
+                if all(int(a) in data for a in addrs):
+                    rows[device_id] = [data[int(a)] for a in addrs]
+            if len(rows) < len(layout):
+                print("⚠️ Incomplete read — sample skipped.")
+                continue
+
+            references.append(ref)
+            for device_id, row in rows.items():
+                samples[device_id].append(row)
+
+            print(f"✅ Sample {len(references)} stored.")
+            if len(references) < MIN_SAMPLES:
+                continue
+
+            Y = np.array(references)
+            for device_id, (ranges, addrs) in layout.items():
+                fits = fit_signed_and_unsigned(np.array(samples[device_id]), Y)
+                for q, name in enumerate(QUANTITIES):
+                    print(f"\n📈 ID {device_id} — best registers for {name}:")
+                    for c in rank(addrs, fits, q):
+                        print(f"  → Reg {c['address']}: {name} = {c['scale']:.6g} * raw {c['offset']:+.6g}"
+                              f"{' (signed)' if c['signed'] else ''}  R²={c['r2']:.4f}  rms={c['rms']:.3f}")
+            print("\n----------------------------------------------\n")
+
+        except KeyboardInterrupt:
+            print("\n🔚 Exiting...")
+            break
+        except ValueError:
+            print("⚠️ Enter a number.")
+
+    client.close()
+
+    if len(references) >= MIN_SAMPLES:
+        Y = np.array(references)
+        calibration = {}
+        for device_id, (ranges, addrs) in layout.items():
+            fits = fit_signed_and_unsigned(np.array(samples[device_id]), Y)
+            tags = []
+            for q, name in enumerate(QUANTITIES):
+                best = rank(addrs, fits, q, top_n=1)
+                if best and best[0]["r2"] >= MIN_R2:
+                    tags.append({"name": name, **best[0]})
+            calibration[str(device_id)] = {"samples": len(references), "tags": tags}
+        with open(OUTPUT, "w", encoding="utf-8") as f:
+            json.dump(calibration, f, indent=2)
+        print(f"💾 Calibration written to {OUTPUT} (tags ready for devices.json)")
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Vectorized report-by-exception: emit only the registers that moved by more
+# than their deadband since they were last reported.
+
+
+class Changes:
+    """Deltas from one update: positions (index arrays), new and previously reported values."""
+
+    def __init__(self, timestamp, index, values, previous):
+        self.timestamp = timestamp
+        self.index = index
+        self.values = values
+        self.previous = previous
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """(position, value, previous) per change; position is an int or a tuple for 2-D blocks."""
+        positions = zip(*self.index) if len(self.index) > 1 else self.index[0]
+        for pos, val, prev in zip(positions, self.values.tolist(), self.previous.tolist()):
+            yield (tuple(int(p) for p in pos) if isinstance(pos, tuple) else int(pos)), val, prev
+
+
+class ChangeDetector:
+    """Deadband change detection over blocks of any shape, e.g. devices x registers.
+
+    deadband (absolute) and percent (of the last reported value) broadcast
+    against the block shape, so each register can have its own. A register is
+    reported when |new - last reported| exceeds the larger of the two; because
+    the reference is the last *reported* value, slow drift is still reported
+    once it adds up. NaN (failed read) never counts as a change.
+    """
+
+    def __init__(self, shape, deadband=0.0, percent=0.0, report_first=True):
+        self.deadband = np.broadcast_to(np.asarray(deadband, dtype=np.float64), shape).copy()
+        self.percent = np.broadcast_to(np.asarray(percent, dtype=np.float64), shape).copy() / 100.0
+        self.last = np.zeros(shape, dtype=np.float64)
+        self.seen = np.zeros(shape, dtype=bool) if report_first else np.ones(shape, dtype=bool)
+        self._band = np.empty(shape, dtype=np.float64)
+
+    def update(self, block, timestamp):
+        block = np.asarray(block, dtype=np.float64)
+        np.abs(self.last, out=self._band)
+        np.multiply(self._band, self.percent, out=self._band)
+        np.maximum(self._band, self.deadband, out=self._band)
+
+        with np.errstate(invalid="ignore"):
+            changed = (np.abs(block - self.last) > self._band) | ~self.seen
+        changed &= ~np.isnan(block)
+
+        index = np.nonzero(changed)
+        previous = self.last[index]
+        values = block[index]
+        self.last[index] = values
+        self.seen[index] = True
+        return Changes(timestamp, index, values, previous)
+
+
+def change_series(values, deadband=0.0, percent=0.0, report_first=True):
+    """Reports for one register's series: (indices, values, previous).
+
+    Same rules and float64 arithmetic as ChangeDetector.update, one sample at a
+    time without per-sample numpy overhead — for replaying recorded series.
+    """
+    deadband = float(np.float64(deadband))
+    fraction = float(np.float64(percent) / 100.0)
+    last = 0.0
+    seen = not report_first
+    index, reported, previous = [], [], []
+    for i, v in enumerate(np.asarray(values, dtype=np.float64).tolist()):
+        if v != v:                   # NaN: failed read
+            continue
+        band = abs(last) * fraction
+        if band < deadband:
+            band = deadband
+        if abs(v - last) > band or not seen:
+            index.append(i)
+            reported.append(v)
+            previous.append(last)
+            last = v
+            seen = True
+    return np.array(index, dtype=np.intp), np.array(reported), np.array(previous)
@@ -1,6 +1,5 @@
-from pymodbus.client import ModbusSerialClient
-from pymodbus import FramerType
-import time
+from modbus_auto_detect import try_connection as probe_ids
+import discovery_cache
 
 PORT = "COM4"  # Change to your serial port
 
@@ -21,42 +20,36 @@ device_ids = range(1, 32)  # Try 1–15 if needed
 print("🔍 Scanning for Fuji VFD communication parameters...\n")
 
 found = False
+cache = discovery_cache.load_cache()
 
 
 def try_connection(baud, parity, stop, ids):
     """Try reading holding registers for given settings."""
     global found
-    client = ModbusSerialClient(
-        port=PORT,
-        baudrate=baud,
-        parity=parity,
-        stopbits=stop,
-        bytesize=8,
-        framer=FramerType.RTU,
-        timeout=0.2,  # Short timeout for faster fail
-    )
-
-    if not client.connect():
+    # Timeout follows the baud rate; a garbled reply aborts the remaining IDs early
+    answered = probe_ids(PORT, baud, parity, stop, ids)
+    if not answered:
         return False
 
-    for device_id in ids:
-        try:
-            result = client.read_holding_registers(address=1, count=1, device_id=device_id)
-            if not result.isError() and getattr(result, "registers", None):
-                print(f"\n✅ Communication Found!")
-                print(f"   Baud Rate : {baud}")
-                print(f"   Parity    : {parity}")
-                print(f"   Stop Bits : {stop}")
-                print(f"   Device ID : {device_id}")
-                print(f"   (Matches Fuji parameters Y03–Y06)")
-                found = True
-                client.close()
-                return True
-        except Exception:
-            pass
-    client.close()
-    return False
+    print(f"\n✅ Communication Found!")
+    print(f"   Baud Rate : {baud}")
+    print(f"   Parity    : {parity}")
+    print(f"   Stop Bits : {stop}")
+    print(f"   Device ID : {answered[0]}")
+    print(f"   (Matches Fuji parameters Y03–Y06)")
+    found = True
+    # First-only scan: add this ID to the cached list rather than replacing it
+    discovery_cache.record(cache, PORT, baud, parity, stop, answered, merge=True)
+    discovery_cache.save_cache(cache)
+    return True
+
 
+# --- Step 0: Try the settings that worked last time ---
+last = discovery_cache.last_settings(cache, PORT)
+if last and last[3]:
+    print(f"💾 Trying last known-good settings ({last[0]} bps, {last[1]}, {last[2]} stop bit, ID {last[3][0]})...")
+    if try_connection(last[0], last[1], last[2], last[3][:1]):
+        raise SystemExit
 
 # --- Step 1: Try Fuji default first ---
 print("⚡ Trying Fuji default settings first (9600 bps, N, 1 stop bit, ID 1)...")
@@ -65,11 +58,10 @@ if try_connection(default_settings["baud"], default_settings["parity"], default_
 
 # --- Step 2: If not found, expand search ---
 print("\n🔁 Fuji default not responding — expanding scan...\n")
-for baud in baud_rates:
-    for parity in parities:
-        for stop in stop_bits:
-            print(f"Trying baud={baud}, parity={parity}, stop={stop}", end="\r")
-            if try_connection(baud, parity, stop, device_ids):
-                raise SystemExit
+combos = [(baud, parity, stop) for baud in baud_rates for parity in parities for stop in stop_bits]
+for baud, parity, stop in discovery_cache.order_by_hits(cache, PORT, combos):
+    print(f"Trying baud={baud}, parity={parity}, stop={stop}", end="\r")
+    if try_connection(baud, parity, stop, device_ids):
+        raise SystemExit
 
 print("\n❌ No Modbus response found. Check wiring, power, or RS485 polarity.")
@@ -1,4 +1,7 @@
 from pymodbus.client import ModbusSerialClient
+from register_map import map_registers, read_ranges
+from scaling import scale_values
+import numpy as np
 import time
 
 # === USER SETTINGS ===
@@ -45,6 +48,8 @@ except Exception as e:
 
 print(f"Starting full scan of {NUM_REGS} registers from address {START_ADDR}...\n")
 
+valid_ranges = None    # Learned on the first pass, then only valid ranges are read
+
 # === MAIN LOOP ===
 while True:
     try:
@@ -52,39 +57,35 @@ while True:
         temp_live = float(input("Enter current Temperature (°C) from VFD: "))
         rh_live = float(input("Enter current Humidity (%RH) from VFD: "))
 
-        # 2️⃣ Read registers in safe chunks
-        data = []
-        remaining = NUM_REGS
-        addr = START_ADDR
-
-        while remaining > 0:
-            count = min(remaining, BLOCK_SIZE)
-            result = client.read_holding_registers(address=addr, count=count, device_id=SLAVE_ID)
-            if result.isError():
-                print(f"❌ Modbus read error at {addr}")
-                break
-            data.extend(result.registers)
-            addr += count
-            remaining -= count
+        # 2️⃣ Read registers in safe chunks (illegal addresses are split out, not fatal)
+        if valid_ranges is None:
+            valid_ranges, data, _ = map_registers(client, SLAVE_ID, START_ADDR, START_ADDR + NUM_REGS, BLOCK_SIZE)
+            skipped = NUM_REGS - len(data)
+            if skipped:
+                print(f"ℹ️ {skipped} unreadable registers skipped, valid ranges: {valid_ranges}")
+        else:
+            data = read_ranges(client, SLAVE_ID, valid_ranges, BLOCK_SIZE)
 
         if not data:
             print("⚠️ No data read. Check address range or VFD mapping.")
+            valid_ranges = None
             continue
 
         # 3️⃣ Try to identify possible matching registers
         print("\n🔍 Checking for registers matching given values...")
-        found = []
-        for i, raw in enumerate(data):
-            addr = START_ADDR + i
+        addrs = np.array(sorted(data))
+        raws = np.array([data[a] for a in addrs], dtype=np.uint16)
 
-            # Example scaling guesses (depends on your VFD)
-            value_60 = (raw / 1000 - 4) * 60 / 16
-            value_100 = (raw / 1000 - 4) * 100 / 16
+        # Example scaling guesses (depends on your VFD), applied to every register at once
+        value_60 = scale_values(raws, {"format": "4-20mA", "full_scale": 60})
+        value_100 = scale_values(raws, {"format": "4-20mA", "full_scale": 100})
 
-            if abs(value_60 - temp_live) <= 0.5:
-                found.append((addr, raw, round(value_60, 2), "Temp (0–60°C scale)"))
-            if abs(value_100 - rh_live) <= 0.5:
-                found.append((addr, raw, round(value_100, 2), "Humidity (0–100% scale)"))
+        found = []
+        for i in np.flatnonzero(np.abs(value_60 - temp_live) <= 0.5):
+            found.append((int(addrs[i]), int(raws[i]), round(float(value_60[i]), 2), "Temp (0–60°C scale)"))
+        for i in np.flatnonzero(np.abs(value_100 - rh_live) <= 0.5):
+            found.append((int(addrs[i]), int(raws[i]), round(float(value_100[i]), 2), "Humidity (0–100% scale)"))
+        found.sort(key=lambda f: f[0])
 
         if found:
             print("\n✅ Possible matching registers:")
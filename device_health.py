@@ -0,0 +1,185 @@
+from pymodbus.exceptions import ModbusException, ModbusIOException
+import time
+
+# Per-device circuit breaker for multi-drive loops. Wrap the shared client:
+#
+#   health = HealthMonitor(DEVICE_IDS)
+#   client = HealthClient(client, health)          # AsyncHealthClient for async clients
+#
+# After FAIL_THRESHOLD timeouts in a row a drive is quarantined: its reads
+# fail at once (DeviceQuarantined, a ModbusException, so existing error
+# handling applies) instead of costing a full timeout each. It is re-probed
+# with a single one-register read on an exponential backoff, and polled
+# normally again as soon as it answers.
+
+FAIL_THRESHOLD = 3       # Consecutive timeouts before a drive is quarantined
+BACKOFF_START = 2.0      # Seconds until the first re-probe
+BACKOFF_MAX = 300.0      # Longest wait between re-probes
+BACKOFF_FACTOR = 2.0
+
+# --- Device states ---
+HEALTHY = "healthy"
+QUARANTINED = "quarantined"
+
+# --- What the caller may do now ---
+POLL = "poll"
+PROBE = "probe"
+SKIP = "skip"
+
+
+class DeviceQuarantined(ModbusException):
+    """Read refused without touching the bus: the drive is quarantined."""
+
+    def __init__(self, device_id, retry_in):
+        super().__init__(f"Device {device_id} quarantined (next probe in {retry_in:.0f} s)")
+        self.device_id = device_id
+        self.retry_in = retry_in
+
+
+class DeviceHealth:
+    """Breaker state for one drive."""
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.state = HEALTHY
+        self.failures = 0            # Consecutive timeouts
+        self.backoff = 0.0
+        self.next_probe = 0.0
+        self.since = None            # When the current quarantine started
+        self.timeouts = 0
+        self.quarantines = 0
+
+
+class HealthMonitor:
+    """Tracks every drive; on_change(health, old_state) is called on each state change."""
+
+    def __init__(self, device_ids=(), threshold=FAIL_THRESHOLD, backoff_start=BACKOFF_START,
+                 backoff_max=BACKOFF_MAX, backoff_factor=BACKOFF_FACTOR, on_change=None, clock=time.monotonic):
+        self.threshold = threshold
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.backoff_factor = backoff_factor
+        self.on_change = on_change or self.print_change
+        self.clock = clock
+        self.devices = {}
+        for device_id in device_ids:
+            self.device(device_id)
+
+    def device(self, device_id):
+        health = self.devices.get(device_id)
+        if health is None:
+            health = self.devices[device_id] = DeviceHealth(device_id)
+        return health
+
+    def check(self, device_id):
+        """POLL (healthy), PROBE (quarantined, re-probe due) or SKIP."""
+        health = self.device(device_id)
+        if health.state == HEALTHY:
+            return POLL
+        return PROBE if self.clock() >= health.next_probe else SKIP
+
+    def retry_in(self, device_id):
+        return max(0.0, self.device(device_id).next_probe - self.clock())
+
+    def success(self, device_id):
+        """The drive answered (data or a Modbus exception reply)."""
+        health = self.device(device_id)
+        health.failures = 0
+        if health.state != HEALTHY:
+            health.state = HEALTHY
+            health.backoff = 0.0
+            self.on_change(health, QUARANTINED)
+
+    def failure(self, device_id):
+        """The drive did not answer."""
+        health = self.device(device_id)
+        now = self.clock()
+        health.failures += 1
+        health.timeouts += 1
+        if health.state == QUARANTINED:
+            # Failed re-probe: wait longer next time
+            health.backoff = min(health.backoff * self.backoff_factor, self.backoff_max)
+            health.next_probe = now + health.backoff
+        elif health.failures >= self.threshold:
+            health.state = QUARANTINED
+            health.quarantines += 1
+            health.since = now
+            health.backoff = self.backoff_start
+            health.next_probe = now + health.backoff
+            self.on_change(health, HEALTHY)
+
+    def quarantined(self):
+        return [d for d, h in self.devices.items() if h.state == QUARANTINED]
+
+    def print_change(self, health, old_state):
+        """Default on_change; the time out is measured on the monitor's clock."""
+        if health.state == QUARANTINED:
+            print(f"🚫 ID {health.device_id} quarantined after {health.failures} timeouts "
+                  f"— re-probing in {health.backoff:g} s")
+        else:
+            away = self.clock() - health.since if health.since is not None else 0.0
+            print(f"✅ ID {health.device_id} answering again (was out for {away:.0f} s)")
+
+
+class HealthClient:
+    """Wraps a sync pymodbus client; reads and writes go through the device's breaker."""
+
+    def __init__(self, client, health):
+        self.client = client
+        self.health = health
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _call(self, method, address, device_id, /, *args, **kwargs):
+        decision = self.health.check(device_id)
+        if decision == SKIP:
+            raise DeviceQuarantined(device_id, self.health.retry_in(device_id))
+        if decision == PROBE:
+            # One cheap read first; the full request only goes out if the drive answers
+            self._attempt(self.client.read_holding_registers, device_id, address, count=1)
+        return self._attempt(method, device_id, address, *args, **kwargs)
+
+    def _attempt(self, method, device_id, *args, **kwargs):
+        try:
+            rr = method(*args, device_id=device_id, **kwargs)
+        except ModbusIOException:
+            self.health.failure(device_id)
+            raise
+        self.health.success(device_id)
+        return rr
+
+    def read_holding_registers(self, address, *, device_id=1, **kwargs):
+        return self._call(self.client.read_holding_registers, address, device_id, **kwargs)
+
+    def read_input_registers(self, address, *, device_id=1, **kwargs):
+        return self._call(self.client.read_input_registers, address, device_id, **kwargs)
+
+    def write_register(self, address, value, *, device_id=1, **kwargs):
+        return self._call(self.client.write_register, address, device_id, value, **kwargs)
+
+    def write_registers(self, address, values, *, device_id=1, **kwargs):
+        return self._call(self.client.write_registers, address, device_id, values, **kwargs)
+
+
+class AsyncHealthClient(HealthClient):
+    """HealthClient for AsyncModbusSerialClient / AsyncModbusTcpClient."""
+
+    async def _call(self, method, address, device_id, /, *args, **kwargs):
+        decision = self.health.check(device_id)
+        if decision == SKIP:
+            raise DeviceQuarantined(device_id, self.health.retry_in(device_id))
+        if decision == PROBE:
+            await self._attempt(self.client.read_holding_registers, device_id, address, count=1)
+        return await self._attempt(method, device_id, address, *args, **kwargs)
+
+    async def _attempt(self, method, device_id, *args, **kwargs):
+        try:
+            rr = await method(*args, device_id=device_id, **kwargs)
+        except ModbusIOException:
+            self.health.failure(device_id)
+            raise
+        self.health.success(device_id)
+        return rr
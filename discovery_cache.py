@@ -0,0 +1,77 @@
+import json
+import os
+
+# Last known-good line settings per serial port, so re-detection can start there.
+#
+# File layout:
+#   {"COM4": {"last": {"baud": 9600, "parity": "E", "stop": 1, "device_ids": [2, 4]},
+#             "hits": {"9600,E,1": 5}}}
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "discovery_cache.json")
+
+
+def setting_key(baud, parity, stop):
+    return f"{baud},{parity},{stop}"
+
+
+def load_cache(path=CACHE_FILE):
+    """Return the cache dict ({} if missing or unreadable)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    """Write the cache atomically (temp file + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def last_settings(cache, port):
+    """(baud, parity, stop, device_ids) that last worked on port, or None."""
+    last = cache.get(port, {}).get("last")
+    if not last or not last.get("device_ids"):
+        return None
+    return last["baud"], last["parity"], last["stop"], list(last["device_ids"])
+
+
+def record(cache, port, baud, parity, stop, device_ids, merge=False):
+    """Store a successful detection and bump its hit count.
+
+    merge=True adds device_ids to the cached list when the settings are unchanged
+    (for first-only scans that see a single ID) instead of replacing it.
+    A result with no device IDs is not a detection and is not recorded.
+    """
+    if not device_ids:
+        return
+    entry = cache.setdefault(port, {"last": None, "hits": {}})
+    device_ids = list(device_ids)
+    last = entry["last"]
+    if merge and last and (last["baud"], last["parity"], last["stop"]) == (baud, parity, stop):
+        device_ids = sorted(set(last["device_ids"]) | set(device_ids))
+    entry["last"] = {"baud": baud, "parity": parity, "stop": stop, "device_ids": device_ids}
+    key = setting_key(baud, parity, stop)
+    entry["hits"][key] = entry["hits"].get(key, 0) + 1
+
+
+def order_by_hits(cache, port, combos):
+    """Sort (baud, parity, stop, ...) combos by past hits on this port, then on any port.
+
+    The sort is stable, so combos never seen keep their original order.
+    """
+    port_hits = cache.get(port, {}).get("hits", {})
+    all_hits = {}
+    for entry in cache.values():
+        for key, n in entry.get("hits", {}).items():
+            all_hits[key] = all_hits.get(key, 0) + n
+
+    def score(combo):
+        key = setting_key(*combo[:3])
+        return -port_hits.get(key, 0), -all_hits.get(key, 0)
+
+    return sorted(combos, key=score)
@@ -0,0 +1,260 @@
+import sys
+import time
+
+import numpy as np
+import serial  # pyserial (installed with pymodbus[serial])
+
+from acquire import print_values, alarm_checker
+from device_health import HealthMonitor, PROBE, SKIP
+from modbus_rtu import read_request, crc16, frame_gap, response_timeout, turnaround, RESPONSE_DELAY
+from profiles import load_profiles, compile_profiles, PROFILE_FILE
+from register_map import ILLEGAL_ADDRESS
+
+# Lean FC3 read path for a fixed poll plan, straight on pyserial:
+#
+#   python fast_rtu.py [devices.json]
+#
+# Every request frame (CRC included) is built once up front, every reply is
+# read into its own slot of one preallocated buffer, and the registers are
+# handed on as big-endian numpy views of that buffer — no pymodbus request or
+# response objects and no per-read register lists. The frames on the wire are
+# byte-for-byte what client.read_holding_registers(address, count=count,
+# device_id=device_id) sends, and the same 3.5-character gap is kept between
+# transactions.
+
+# --- Read status ---
+OK = "ok"
+EXCEPTION = "exception"     # Slave answered with a Modbus exception (code in last_code)
+TIMEOUT = "timeout"
+BAD_FRAME = "bad_frame"     # CRC error, wrong ID/function or short frame
+
+MAX_REGS = 125
+
+
+class FastReader:
+    """Precompiled FC3 reads over an open pyserial port.
+
+    add() registers a (device_id, address, count) read once and returns its
+    index; read(index) runs it, after which registers(index) is a zero-copy
+    '>u2' view of the reply (valid until that read is run again).
+    """
+
+    def __init__(self, ser, baud=9600, parity="E", stop=1):
+        self.ser = ser
+        self.gap = frame_gap(baud, parity, stop)
+        self.requests = []
+        self.headers = []
+        self.offsets = []
+        self.counts = []
+        self.size = 0
+        self.buffer = bytearray()
+        self.view = memoryview(self.buffer)
+        self.last_code = 0
+        self.last_reply = 0.0
+        self.transactions = 0
+        self.errors = 0
+
+    def add(self, device_id, address, count):
+        if not 1 <= count <= MAX_REGS:
+            raise ValueError(f"FC3 count must be 1..{MAX_REGS}, got {count}")
+        self.requests.append(read_request(device_id, address, count))
+        self.headers.append(bytes((device_id, 3, 2 * count)))
+        self.offsets.append(self.size)
+        self.counts.append(count)
+        self.size += 5 + 2 * count
+        self.buffer = bytearray(self.size)       # Grown while compiling, never on the hot path
+        self.view = memoryview(self.buffer)
+        return len(self.requests) - 1
+
+    def registers(self, index):
+        return np.frombuffer(self.buffer, ">u2", self.counts[index], self.offsets[index] + 3)
+
+    def read(self, index):
+        """Run read `index`; returns OK, EXCEPTION, TIMEOUT or BAD_FRAME."""
+        ser = self.ser
+        off = self.offsets[index]
+        frame = self.view[off:off + 5 + 2 * self.counts[index]]
+
+        wait = self.last_reply + self.gap - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        ser.write(self.requests[index])
+        self.transactions += 1
+
+        got = ser.readinto(frame[:3])
+        if got == 3 and frame[1] & 0x80:
+            got += ser.readinto(frame[3:5])
+            status = OK if got == 5 and crc16(frame[:5]) == 0 else BAD_FRAME
+            if status == OK:
+                self.last_code = frame[2]
+                status = EXCEPTION
+        elif got == 3:
+            got += ser.readinto(frame[3:])
+            status = OK if got == len(frame) else BAD_FRAME
+        else:
+            status = TIMEOUT if got == 0 else BAD_FRAME
+        self.last_reply = time.perf_counter()
+
+        if status == OK and (frame[:3] != self.headers[index] or crc16(frame) != 0):
+            status = BAD_FRAME
+        elif status == EXCEPTION and frame[0] != self.headers[index][0]:
+            status = BAD_FRAME
+        if status in (TIMEOUT, BAD_FRAME):
+            self.errors += 1
+            ser.reset_input_buffer()     # Drop a late or garbled reply before the next request
+        return status
+
+
+class FastPoller:
+    """Compiled devices (profiles.py) read through one FastReader.
+
+    read_device() fills dev.raw exactly like acquire.read_device(), including
+    re-planning a device whose bridged block is rejected with code 2. With a
+    HealthMonitor, a quarantined drive is skipped, and re-probed with a single
+    one-register read (as HealthClient does) before its plan is sent.
+    """
+
+    def __init__(self, ser, devices, baud=9600, parity="E", stop=1, health=None):
+        self.reader = FastReader(ser, baud, parity, stop)
+        self.health = health
+        self.blocks = {}
+        self.probes = {}
+        for dev in devices:
+            self.compile(dev)
+
+    def _read(self, device_id, index):
+        status = self.reader.read(index)
+        if self.health is not None:
+            if status == TIMEOUT:
+                self.health.failure(device_id)
+            elif status != BAD_FRAME:
+                self.health.success(device_id)
+        return status
+
+    def compile(self, dev):
+        self.blocks[dev.device_id] = [self.reader.add(dev.device_id, start, count) for start, count in dev.plan]
+        if dev.device_id not in self.probes:
+            self.probes[dev.device_id] = self.reader.add(dev.device_id, dev.plan[0][0], 1)
+
+    def _skip(self, dev):
+        for index in range(len(dev.plan)):
+            dev.store_block(index, None)
+        dev.process()
+        return False
+
+    def read_device(self, dev):
+        """Read the device's plan into dev.raw and scale it; True if every block answered."""
+        reader = self.reader
+        if self.health is not None:
+            decision = self.health.check(dev.device_id)
+            if decision == SKIP:
+                return self._skip(dev)
+            if decision == PROBE and self._read(dev.device_id, self.probes[dev.device_id]) not in (OK, EXCEPTION):
+                return self._skip(dev)
+        all_ok = True
+        index = 0
+        while index < len(dev.plan):
+            read = self.blocks[dev.device_id][index]
+            status = self._read(dev.device_id, read)
+            dev.store_block(index, reader.registers(read) if status == OK else None)
+            if status == EXCEPTION and reader.last_code == ILLEGAL_ADDRESS and dev.drop_bridge(index):
+                # Re-planned without the bad bridge: compile its frames and read the new blocks
+                self.compile(dev)
+                continue
+            all_ok = all_ok and status == OK
+            index += 1
+        dev.process()
+        return all_ok
+
+
+class FastAcquisition:
+    """acquire.Acquisition's fixed cycle grid, synchronous, over a FastPoller."""
+
+    def __init__(self, poller, devices, cycle=2.0, on_values=None, on_cycle=None):
+        self.poller = poller
+        self.devices = devices
+        self.cycle = cycle
+        self.on_values = on_values or print_values
+        self.on_cycle = on_cycle
+        self.cycles = 0
+        self._stopping = False
+
+    def run_cycle(self):
+        for dev in self.devices:
+            self.poller.read_device(dev)
+            dev.timestamp = time.time()
+            self.on_values(dev, dev.timestamp)
+        self.cycles += 1
+        if self.on_cycle:
+            self.on_cycle(self)
+
+    def run(self):
+        next_due = time.monotonic()
+        while not self._stopping:
+            self.run_cycle()
+            next_due += self.cycle
+            now = time.monotonic()
+            if next_due < now:
+                next_due = now       # Bus slower than the cycle: run back-to-back
+            time.sleep(next_due - now)
+
+    def stop(self):
+        self._stopping = True
+
+
+def open_port(config):
+    """pyserial port for a profile, with the timeout a full 125-register reply needs."""
+    baud = config.get("baudrate", 9600)
+    parity = config.get("parity", "E")
+    stop = config.get("stopbits", 1)
+    return serial.Serial(
+        port=config["port"],
+        baudrate=baud,
+        parity=parity,
+        stopbits=stop,
+        bytesize=8,
+        timeout=max(config.get("timeout", 1),
+                    response_timeout(baud, parity, stop, 8, 5 + 2 * MAX_REGS,
+                                     turnaround(config.get("response_delay", RESPONSE_DELAY)))),
+    )
+
+
+def main(path=PROFILE_FILE):
+    config = load_profiles(path)
+    devices = compile_profiles(config)
+
+    print(f"🔌 Opening {config['port']}...")
+    try:
+        ser = open_port(config)
+    except serial.SerialException as e:
+        print(f"❌ Cannot open port: {e}")
+        return
+
+    health = HealthMonitor(dev.device_id for dev in devices)
+    poller = FastPoller(ser, devices, config.get("baudrate", 9600), config.get("parity", "E"),
+                        config.get("stopbits", 1), health)
+    handlers = [print_values]
+    check_alarms = alarm_checker(devices)
+    if check_alarms:
+        handlers.append(check_alarms)
+
+    def on_values(dev, timestamp):
+        for handler in handlers:
+            handler(dev, timestamp)
+
+    reads = sum(len(dev.plan) for dev in devices)
+    print(f"✅ Fast path: {len(devices)} drives, {reads} prebuilt reads, {poller.reader.size} byte reply buffer\n")
+    acquisition = FastAcquisition(poller, devices, cycle=config.get("cycle", 2), on_values=on_values)
+    try:
+        acquisition.run()
+    finally:
+        ser.close()
+        reader = poller.reader
+        print(f"\n📊 {reader.transactions} transactions, {reader.errors} errors")
+
+
+if __name__ == "__main__":
+    try:
+        main(*sys.argv[1:2])
+    except KeyboardInterrupt:
+        print("\n🔚 Polling stopped.")
@@ -0,0 +1,302 @@
+import math
+import os
+import random
+import select
+import struct
+import termios
+import threading
+import time
+import tty
+
+from modbus_rtu import with_crc, check_crc, char_time, TURNAROUND
+
+# Answers as one or more Fuji FRENIC-HVAC drives on a pseudo-terminal (Linux/macOS),
+# so the scanners and pollers can run without hardware. Start it and point a
+# script's PORT at the printed device:
+#
+#   python fuji_simulator.py
+#   ✅ Simulating IDs [2, 4, 7, 9] at 9600 E 1 on /dev/pts/5
+#
+# or embed it (benchmarks):
+#
+#   sim = Simulator(build_slaves(SLAVES)); sim.start(); ...; sim.stop()
+#
+# Linux ptys cannot carry a parity bit: the kernel drops PARENB, and pyserial
+# (so pymodbus) then fails with EINVAL when it re-configures a pty opened with
+# parity "E". Open clients with parity "N" against the simulator; reply timing
+# is still worked out for PARITY below.
+
+# === SIMULATOR SETTINGS ===
+BAUDRATE = 9600
+PARITY = "E"
+STOPBITS = 1
+LATENCY = TURNAROUND     # Slave turnaround in seconds (before the reply goes out)
+EMULATE_WIRE = True      # Also wait the time request + reply would take on the wire at BAUDRATE
+MISMATCH = "silent"      # Client on other line settings: "silent" (like a real drive) or "garbage"
+
+# Fuji function code groups sit at group * 256 + number (M49 = 0x0831 = 2097).
+# Readable numbers per group: (group, first, last + 1). Everything else is illegal (exception 2).
+LAYOUT = [
+    (0x00, 0, 100),      # F  fundamental
+    (0x01, 0, 100),      # E  terminal functions
+    (0x02, 0, 100),      # C  control
+    (0x03, 0, 100),      # P  motor
+    (0x04, 0, 100),      # H  high performance
+    (0x08, 0, 128),      # M  monitor (2048–2175: 2097/2102, 2120/2121)
+    (0x0B, 150, 200),    # 2966–3015 (2999/3004, temp11.py)
+]
+
+# Waveform per register: raw value = mean + amplitude * wave(t / period) + noise.
+# Means are picked so the devices.json scaling reads ~25 °C / ~50 %RH.
+AMBIENT_M49 = [
+    {"address": 2097, "wave": "sine", "mean": 14245, "amplitude": 1700, "period": 600, "noise": 20},
+    {"address": 2102, "wave": "sine", "mean": 9920, "amplitude": 1000, "period": 900, "noise": 20},
+    {"address": 2999, "wave": "ramp", "mean": 16384, "amplitude": 3000, "period": 120},
+    {"address": 3004, "wave": "square", "mean": 8000, "amplitude": 2000, "period": 60},
+]
+SLAVES = [
+    {"id": 2, "waves": AMBIENT_M49},
+    {"id": 4, "waves": AMBIENT_M49, "latency": 0.03, "jitter": 0.02},
+    {"id": 7, "waves": [
+        {"address": 2120, "wave": "sine", "mean": 3677, "amplitude": 800, "period": 600, "noise": 10},
+        {"address": 2121, "wave": "sine", "mean": 17966, "amplitude": 1400, "period": 900, "noise": 10},
+    ]},
+    {"id": 9, "timeout_rate": 0.02, "illegal": [(2130, 2140)], "waves": [
+        {"address": 2120, "wave": "sine", "mean": 10667, "amplitude": 800, "period": 600, "noise": 10},
+        {"address": 2121, "wave": "sine", "mean": 5000, "amplitude": 500, "period": 900, "noise": 10},
+    ]},
+]
+
+WAVES = ("const", "sine", "ramp", "square", "noise")
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+
+
+class Waveform:
+    """Time-varying raw register value (uint16; negative values wrap like a signed register)."""
+
+    def __init__(self, wave="const", mean=0, amplitude=0, period=60, noise=0, **_):
+        if wave not in WAVES:
+            raise ValueError(f"Unknown wave {wave!r} (expected one of {', '.join(WAVES)})")
+        self.wave = wave
+        self.mean = mean
+        self.amplitude = amplitude
+        self.period = period
+        self.noise = noise
+
+    def value(self, t):
+        phase = (t / self.period) % 1.0
+        if self.wave == "sine":
+            shape = math.sin(2 * math.pi * phase)
+        elif self.wave == "ramp":
+            shape = 2 * phase - 1
+        elif self.wave == "square":
+            shape = 1.0 if phase < 0.5 else -1.0
+        elif self.wave == "noise":
+            shape = random.uniform(-1, 1)
+        else:
+            shape = 0.0
+        raw = self.mean + self.amplitude * shape
+        if self.noise:
+            raw += random.gauss(0, self.noise)
+        return int(round(raw)) & 0xFFFF
+
+
+class SimSlave:
+    """One simulated drive: register layout, waveforms, written values and failure modes."""
+
+    def __init__(self, device_id, layout=LAYOUT, waves=(), illegal=(), latency=LATENCY, jitter=0.0,
+                 timeout_rate=0.0, registers=None):
+        self.device_id = device_id
+        self.valid = sorted((g * 256 + lo, g * 256 + hi) for g, lo, hi in layout)
+        self.illegal = [tuple(r) for r in illegal]
+        self.waves = {w["address"]: Waveform(**w) for w in waves}
+        self.latency = latency
+        self.jitter = jitter
+        self.timeout_rate = timeout_rate
+        self.registers = dict(registers or {})     # Written / fixed values; unset readable registers read 0
+        self.requests = 0
+        self.exceptions = 0
+        self.dropped = 0
+
+    def readable(self, address, count):
+        end = address + count
+        if any(address < hi and lo < end for lo, hi in self.illegal):
+            return False
+        # Every address must fall inside a valid window
+        addr = address
+        for lo, hi in self.valid:
+            if lo <= addr < hi:
+                addr = hi
+                if addr >= end:
+                    return True
+        return False
+
+    def read(self, address, count, t):
+        return [self.waves[a].value(t) if a in self.waves else self.registers.get(a, 0)
+                for a in range(address, address + count)]
+
+    def handle(self, pdu, t):
+        """Response PDU for a request PDU (None: stay silent)."""
+        self.requests += 1
+        if self.timeout_rate and random.random() < self.timeout_rate:
+            self.dropped += 1
+            return None
+        fc = pdu[0]
+        if fc in (3, 4) and len(pdu) == 5:
+            address, count = struct.unpack(">HH", pdu[1:])
+            if not 1 <= count <= 125:
+                return self.exception(fc, ILLEGAL_VALUE)
+            if not self.readable(address, count):
+                return self.exception(fc, ILLEGAL_ADDRESS)
+            return struct.pack(f">BB{count}H", fc, 2 * count, *self.read(address, count, t))
+        if fc == 6 and len(pdu) == 5:
+            address, value = struct.unpack(">HH", pdu[1:])
+            if not self.readable(address, 1):
+                return self.exception(fc, ILLEGAL_ADDRESS)
+            self.registers[address] = value
+            return pdu
+        if fc == 16 and len(pdu) >= 6:
+            address, count, nbytes = struct.unpack(">HHB", pdu[1:6])
+            if not 1 <= count <= 123 or nbytes != 2 * count or len(pdu) != 6 + nbytes:
+                return self.exception(fc, ILLEGAL_VALUE)
+            if not self.readable(address, count):
+                return self.exception(fc, ILLEGAL_ADDRESS)
+            for i, value in enumerate(struct.unpack(f">{count}H", pdu[6:])):
+                self.registers[address + i] = value
+            return pdu[:5]
+        return self.exception(fc, ILLEGAL_FUNCTION)
+
+    def exception(self, fc, code):
+        self.exceptions += 1
+        return bytes([fc | 0x80, code])
+
+
+def build_slaves(specs=SLAVES, layout=LAYOUT):
+    """SimSlave per spec dict ({"id", "waves", "illegal", "latency", "jitter", "timeout_rate", "registers"})."""
+    return [SimSlave(spec["id"], layout, **{k: v for k, v in spec.items() if k != "id"}) for spec in specs]
+
+
+def request_length(buf):
+    """Bytes in the RTU request at the head of buf (None until enough bytes are in)."""
+    if len(buf) < 2:
+        return None
+    fc = buf[1]
+    if fc in (15, 16):
+        return 9 + buf[6] if len(buf) >= 7 else None
+    return 8
+
+
+def _speed_constant(baud):
+    return getattr(termios, f"B{baud}", None)
+
+
+class Simulator:
+    """Serves SimSlaves on the master side of a pty; clients open self.port.
+
+    The pty carries whatever line settings the client opened it with, so the
+    simulator checks them on every request: a client on the wrong baud or
+    stop bits gets silence (or garbage, per mismatch), like on a real bus.
+    Parity is not checked (ptys drop it). Frames are split by function code,
+    not by silent intervals.
+    """
+
+    def __init__(self, slaves, baud=BAUDRATE, parity=PARITY, stop=STOPBITS, emulate_wire=EMULATE_WIRE,
+                 mismatch=MISMATCH):
+        self.slaves = {s.device_id: s for s in slaves}
+        self.baud = baud
+        self.parity = parity
+        self.stopbits = stop
+        self.char_time = char_time(baud, parity, stop) if emulate_wire else 0.0
+        self.mismatch = mismatch
+        self.master, self._slave_fd = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self.started = time.monotonic()
+        self.frames = 0
+        self.bad_frames = 0
+        self._stopping = False
+        self._thread = None
+
+    def line_matches(self):
+        """True if the client's current pty baud rate and stop bits equal the simulated line."""
+        iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(self.master)
+        expected = _speed_constant(self.baud)
+        if expected is not None and ospeed != expected:
+            return False
+        return (2 if cflag & termios.CSTOPB else 1) == self.stopbits
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="fuji-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping = True
+        if self._thread:
+            self._thread.join()
+        os.close(self.master)
+        os.close(self._slave_fd)
+
+    def run(self):
+        buf = b""
+        while not self._stopping:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                buf = b""            # Idle line: a partial frame is abandoned, as after a 3.5-char gap
+                continue
+            buf += os.read(self.master, 512)
+            while True:
+                n = request_length(buf)
+                if n is None or len(buf) < n:
+                    break
+                frame, buf = buf[:n], buf[n:]
+                if not check_crc(frame):
+                    self.bad_frames += 1
+                    buf = frame[1:] + buf    # Resync one byte on
+                    continue
+                self.frames += 1
+                self.serve(frame)
+
+    def serve(self, frame):
+        unit, pdu = frame[0], frame[1:-2]
+        t = time.monotonic() - self.started
+        if unit == 0:
+            # Broadcast: every slave acts, none answers
+            for slave in self.slaves.values():
+                slave.handle(pdu, t)
+            return
+        slave = self.slaves.get(unit)
+        if slave is None:
+            return
+        matches = self.line_matches()
+        if not matches and self.mismatch == "silent":
+            return
+        response = slave.handle(pdu, t)
+        if response is None:
+            return
+        reply = with_crc(bytes([unit]) + response)
+        delay = slave.latency + (random.uniform(0, slave.jitter) if slave.jitter else 0.0)
+        time.sleep(delay + (len(frame) + len(reply)) * self.char_time)
+        if not matches:
+            reply = bytes(random.getrandbits(8) for _ in reply)
+        os.write(self.master, reply)
+
+
+if __name__ == "__main__":
+    sim = Simulator(build_slaves(SLAVES))
+    print(f"✅ Simulating IDs {sorted(sim.slaves)} at {BAUDRATE} {PARITY} {STOPBITS} on {sim.port}")
+    print("   Set PORT in the script under test to that device (parity 'N', see above). Ctrl+C to stop.\n")
+    sim.start()
+    try:
+        while True:
+            time.sleep(60)
+            print(f"📊 {sim.frames} frames, {sim.bad_frames} bad: " + ", ".join(
+                f"ID {s.device_id} {s.requests} req/{s.exceptions} exc/{s.dropped} dropped"
+                for s in sim.slaves.values()))
+    except KeyboardInterrupt:
+        print("\n🔚 Simulator stopped.")
+        sim.stop()
@@ -0,0 +1,132 @@
+import asyncio
+import math
+import time
+
+# Serves the latest polled values and drive health as OpenMetrics text on
+# http://METRICS_HOST:METRICS_PORT/metrics. The poller calls update() once per
+# cycle, which renders the whole response up front and swaps it in with one
+# assignment; a scrape only writes those bytes, so it never reads the bus and
+# takes the same time however busy the bus is.
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9105
+PREFIX = "fuji"
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_label(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def render(devices, health=None, cycles=None):
+    """OpenMetrics text for compiled devices (profiles.CompiledDevice) and an optional HealthMonitor."""
+    values, raws, oks, stamps = [], [], [], []
+    for dev in devices:
+        ok = dev.tag_ok().tolist()
+        raw = dev.tag_raw().tolist()
+        for i, (tag, value) in enumerate(zip(dev.tags, dev.values.tolist())):
+            labels = _labels(device=dev.name, device_id=dev.device_id, tag=tag["name"], unit=tag.get("unit", ""))
+            values.append(f"{PREFIX}_value{labels} {_number(value)}")
+            raws.append(f"{PREFIX}_raw{labels} {raw[i]}")
+            oks.append(f"{PREFIX}_read_ok{labels} {int(ok[i])}")
+        if dev.timestamp is not None:
+            stamps.append(f"{PREFIX}_sample_timestamp_seconds{_labels(device=dev.name, device_id=dev.device_id)} "
+                          f"{_number(float(dev.timestamp))}")
+
+    lines = [
+        f"# TYPE {PREFIX}_value gauge", f"# HELP {PREFIX}_value Latest scaled tag value (NaN if the read failed).",
+        *values,
+        f"# TYPE {PREFIX}_raw gauge", f"# HELP {PREFIX}_raw Latest raw register word (both registers of a 32-bit tag).",
+        *raws,
+        f"# TYPE {PREFIX}_read_ok gauge", f"# HELP {PREFIX}_read_ok 1 if the last read of the tag succeeded.",
+        *oks,
+        f"# TYPE {PREFIX}_sample_timestamp_seconds gauge",
+        f"# HELP {PREFIX}_sample_timestamp_seconds Unix time of the drive's last poll.",
+        *stamps,
+    ]
+    if health is not None:
+        ups, timeouts, quarantines = [], [], []
+        for device_id, h in sorted(health.devices.items()):
+            labels = _labels(device_id=device_id)
+            ups.append(f"{PREFIX}_device_up{labels} {int(h.state == 'healthy')}")
+            timeouts.append(f"{PREFIX}_device_timeouts_total{labels} {h.timeouts}")
+            quarantines.append(f"{PREFIX}_device_quarantines_total{labels} {h.quarantines}")
+        lines += [
+            f"# TYPE {PREFIX}_device_up gauge", f"# HELP {PREFIX}_device_up 0 while the drive is quarantined.",
+            *ups,
+            f"# TYPE {PREFIX}_device_timeouts counter", f"# HELP {PREFIX}_device_timeouts Reads without a reply.",
+            *timeouts,
+            f"# TYPE {PREFIX}_device_quarantines counter",
+            f"# HELP {PREFIX}_device_quarantines Times the drive was quarantined.",
+            *quarantines,
+        ]
+    if cycles is not None:
+        lines += [f"# TYPE {PREFIX}_poll_cycles counter", f"# HELP {PREFIX}_poll_cycles Completed poll cycles.",
+                  f"{PREFIX}_poll_cycles_total {cycles}"]
+    lines.append("# EOF\n")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _response(status, body, content_type=CONTENT_TYPE):
+    head = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    return head.encode("ascii") + body
+
+
+NOT_FOUND = _response("404 Not Found", b"Not found\n", "text/plain; charset=utf-8")
+
+
+class MetricsServer:
+    """Asyncio HTTP endpoint answering GET /metrics from the last published response."""
+
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self.response = _response("200 OK", b"# EOF\n")
+        self.updated = None
+        self.scrapes = 0
+        self.server = None
+
+    def publish(self, body):
+        """Swap in a new rendered body (one reference assignment, so scrapes see old or new, never half)."""
+        self.response = _response("200 OK", body)
+        self.updated = time.time()
+
+    def update(self, devices, health=None, cycles=None):
+        self.publish(render(devices, health, cycles))
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            line = request.split(b"\r\n", 1)[0].split()
+            path = line[1].split(b"?", 1)[0] if len(line) > 1 else b""
+            self.scrapes += 1
+            writer.write(self.response if line[:1] == [b"GET"] and path == b"/metrics" else NOT_FOUND)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        return self
+
+    def close(self):
+        if self.server:
+            self.server.close()
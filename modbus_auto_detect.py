@@ -1,8 +1,14 @@
-from pymodbus.client import ModbusSerialClient
-from pymodbus import FramerType
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import time
 
-PORT = "COM4"  # Change to your serial port
+import serial  # pyserial (installed with pymodbus[serial])
+
+from modbus_rtu import probe, response_timeout, turnaround, OK, GARBAGE, RESPONSE_DELAY
+import discovery_cache
+
+PORTS = ["COM4"]  # Change to your serial port(s) — one scan worker per port
+response_delay = RESPONSE_DELAY  # Drive's y09 response interval in seconds (raise it if y09 was changed)
 
 # --- Common Fuji defaults ---
 default_settings = {
@@ -18,58 +24,114 @@ parities = ['N', 'E', 'O']
 stop_bits = [1, 2]
 device_ids = range(1, 16)  # Try 1–15 if needed
 
-print("🔍 Scanning for Fuji VFD communication parameters...\n")
-
-found = False
-
-
-def try_connection(baud, parity, stop, ids):
-    """Try reading holding registers for given settings."""
-    global found
-    client = ModbusSerialClient(
-        port=PORT,
-        baudrate=baud,
-        parity=parity,
-        stopbits=stop,
-        bytesize=8,
-        framer=FramerType.RTU,
-        timeout=0.2,  # Short timeout for faster fail
-    )
-
-    if not client.connect():
-        return False
-
-    for device_id in ids:
-        try:
-            result = client.read_holding_registers(address=1, count=1, device_id=device_id)
-            if not result.isError() and getattr(result, "registers", None):
-                print(f"\n✅ Communication Found!")
-                print(f"   Baud Rate : {baud}")
-                print(f"   Parity    : {parity}")
-                print(f"   Stop Bits : {stop}")
-                print(f"   Device ID : {device_id}")
-                print(f"   (Matches Fuji parameters Y03–Y06)")
-                found = True
-                client.close()
-                return True
-        except Exception:
-            pass
-    client.close()
-    return False
-
-
-# --- Step 1: Try Fuji default first ---
-print("⚡ Trying Fuji default settings first (9600 bps, N, 1 stop bit, ID 1)...")
-if try_connection(default_settings["baud"], default_settings["parity"], default_settings["stop"], default_settings["device_ids"]):
-    raise SystemExit
-
-# --- Step 2: If not found, expand search ---
-print("\n🔁 Fuji default not responding — expanding scan...\n")
-for baud in baud_rates:
-    for parity in parities:
-        for stop in stop_bits:
-            print(f"Trying baud={baud}, parity={parity}, stop={stop}", end="\r")
-            if try_connection(baud, parity, stop, device_ids):
-                raise SystemExit
-
-print("\n❌ No Modbus response found. Check wiring, power, or RS485 polarity.")
+# One entry per port that answered
+DetectResult = namedtuple("DetectResult", ["port", "baud", "parity", "stop", "device_ids"])
+
+
+def try_connection(port, baud, parity, stop, ids, first_only=True):
+    """Try reading holding registers for given settings; return the IDs that answered."""
+    try:
+        ser = serial.Serial(port=port, baudrate=baud, parity=parity, stopbits=stop, bytesize=8,
+                            timeout=response_timeout(baud, parity, stop, turnaround=turnaround(response_delay)))
+    except serial.SerialException:
+        return []
+
+    answered = []
+    try:
+        for device_id in ids:
+            try:
+                outcome = probe(ser, device_id)
+            except serial.SerialException:
+                break
+            if outcome == OK:
+                answered.append(device_id)
+                if first_only:
+                    break
+            elif outcome == GARBAGE and not answered:
+                break  # Framing/parity garbage — wrong baud or parity, skip the other IDs
+    finally:
+        ser.close()
+    return answered
+
+
+def candidate_settings():
+    """(baud, parity, stop, ids) to try: Fuji default first, then the full sweep."""
+    combos = [(default_settings["baud"], default_settings["parity"], default_settings["stop"],
+               default_settings["device_ids"])]
+    for baud in baud_rates:
+        for parity in parities:
+            for stop in stop_bits:
+                combos.append((baud, parity, stop, device_ids))
+    return combos
+
+
+def scan_port(port, cache=None):
+    """Search one port for working line settings; return a DetectResult or None.
+
+    With a discovery cache, the last known-good settings are checked first and
+    the rest of the sweep is ordered by past hit frequency.
+    """
+    cache = cache or {}
+    last = discovery_cache.last_settings(cache, port)
+    if last:
+        baud, parity, stop, ids = last
+        answered = try_connection(port, baud, parity, stop, ids, first_only=False)
+        if answered and len(answered) == len(ids):
+            return DetectResult(port, baud, parity, stop, answered)
+        if answered:
+            # Same settings, but the set of slaves changed — list them again
+            found_ids = try_connection(port, baud, parity, stop, device_ids, first_only=False)
+            return DetectResult(port, baud, parity, stop, found_ids or answered)
+
+    for baud, parity, stop, ids in discovery_cache.order_by_hits(cache, port, candidate_settings()):
+        if last and (baud, parity, stop) == tuple(last[:3]):
+            # The cached IDs already failed at these settings; the other IDs still get tried
+            ids = [i for i in ids if i not in last[3]]
+            if not ids:
+                continue
+        answered = try_connection(port, baud, parity, stop, ids)
+        if not answered:
+            continue
+        # Line settings are right — now list every slave on this segment
+        found_ids = try_connection(port, baud, parity, stop, device_ids, first_only=False)
+        return DetectResult(port, baud, parity, stop, found_ids or answered)
+    return None
+
+
+def scan_ports(ports, cache=None):
+    """Scan all ports at once (ports are independent). Returns (results, elapsed seconds)."""
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, len(ports))) as pool:
+        results = list(pool.map(lambda port: scan_port(port, cache), ports))
+    return [r for r in results if r is not None], time.monotonic() - start
+
+
+if __name__ == "__main__":
+    print("🔍 Scanning for Fuji VFD communication parameters...\n")
+    print(f"⚡ Scanning {len(PORTS)} port(s) in parallel: {', '.join(PORTS)}")
+    print("   (Fuji default 9600 bps, N, 1 stop bit, ID 1 is tried first on each port)")
+    for baud in baud_rates:
+        timeout = response_timeout(baud, turnaround=turnaround(response_delay))
+        print(f"   Probe timeout at {baud} bps: {timeout * 1000:.0f} ms")
+
+    cache = discovery_cache.load_cache()
+    results, elapsed = scan_ports(PORTS, cache)
+
+    for r in results:
+        discovery_cache.record(cache, r.port, r.baud, r.parity, r.stop, r.device_ids)
+    if results:
+        discovery_cache.save_cache(cache)
+
+    for r in results:
+        print(f"\n✅ Communication Found on {r.port}!")
+        print(f"   Baud Rate : {r.baud}")
+        print(f"   Parity    : {r.parity}")
+        print(f"   Stop Bits : {r.stop}")
+        print(f"   Device IDs: {', '.join(str(i) for i in r.device_ids)}")
+        print(f"   (Matches Fuji parameters Y03–Y06)")
+
+    missing = [p for p in PORTS if p not in {r.port for r in results}]
+    for port in missing:
+        print(f"\n❌ No Modbus response on {port}. Check wiring, power, or RS485 polarity.")
+
+    print(f"\n⏱️ Sweep finished in {elapsed:.1f} s")
@@ -0,0 +1,226 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import struct
+import time
+
+import serial  # pyserial (installed with pymodbus[serial])
+
+from bus_stats import BusStats, format_report, OK, TIMEOUT, CRC_ERROR, EXCEPTION
+from read_cache import RegisterCache
+from modbus_rtu import with_crc, check_crc, read_reply, response_timeout, frame_gap, TURNAROUND
+
+# Owns the RS-485 port and serves it as Modbus TCP on localhost, so every
+# script can share COM4. Clients only swap the client class:
+#
+#   client = ModbusTcpClient(GATEWAY_HOST, port=GATEWAY_PORT)
+#   client.read_holding_registers(address=2120, count=2, device_id=7)
+
+# === CONNECTION SETTINGS ===
+PORT = "COM4"
+BAUDRATE = 9600
+PARITY = "E"
+STOPBITS = 1
+SLAVE_GRACE = 0.1      # Extra seconds a slow drive gets on top of the computed reply time
+
+GATEWAY_HOST = "127.0.0.1"
+GATEWAY_PORT = 5020    # 502 needs admin rights on most systems
+
+READ_FUNCTIONS = (1, 2, 3, 4)   # Identical in-flight requests with these codes share one transaction
+WRITE_FUNCTIONS = (5, 6, 15, 16, 23)
+
+# Holding-register reads (FC3) answered from cache while fresh: (start, end, ttl seconds).
+# Set CACHE_GROUPS = None to send every read to the bus.
+CACHE_GROUPS = [
+    (2097, 2103, 1.0),   # Temp / RH (temp10.py, temp11.py)
+    (2120, 2122, 1.0),   # AI1 / AI2 (temp3.py–temp6.py)
+]
+
+# Modbus gateway exception codes
+PATH_UNAVAILABLE = 0x0A
+TARGET_NO_RESPONSE = 0x0B
+
+
+def exception_pdu(function, code):
+    return bytes([function | 0x80, code])
+
+
+class RtuBus:
+    """Serializes PDUs onto the RTU line; one transaction on the wire at a time.
+
+    Requests wait in a FIFO queue and a single worker sends them back to back.
+    A read that is identical (same unit and PDU) to one already queued or on
+    the wire is not sent again; it gets the same response. Never across a
+    write: a write to a unit ends the sharing of that unit's earlier reads,
+    and its cached blocks are neither used nor refreshed until the write is done.
+    """
+
+    def __init__(self, ser, baud=BAUDRATE, parity=PARITY, stop=STOPBITS, cache=None, stats=None):
+        self.ser = ser
+        self.cache = cache
+        self.stats = stats
+        self.baud = baud
+        self.parity = parity
+        self.stop = stop
+        self.queue = asyncio.Queue()
+        self.inflight = {}
+        self.writes = {}            # unit -> writes queued or on the wire
+        self.executor = ThreadPoolExecutor(max_workers=1)   # Blocking serial I/O off the event loop
+        self.requests = 0
+        self.transactions = 0
+        self.coalesced = 0
+
+    async def submit(self, unit, pdu):
+        """Response PDU for (unit, pdu); None for broadcasts."""
+        self.requests += 1
+        if pdu and pdu[0] in WRITE_FUNCTIONS:
+            # Reads queued before the write must not answer reads sent after it
+            for key in [k for k in self.inflight if k[0] == unit]:
+                del self.inflight[key]
+            self.writes[unit] = self.writes.get(unit, 0) + 1
+            if self.cache is not None:
+                self.cache.invalidate(unit)
+        elif self.cache is not None and not self.writes.get(unit) and len(pdu) == 5 and pdu[0] == 3:
+            address, count = struct.unpack(">HH", pdu[1:])
+            registers = self.cache.get(unit, address, count)
+            if registers is not None:
+                return bytes([3, 2 * count]) + struct.pack(f">{count}H", *registers)
+
+        key = (unit, pdu) if pdu and pdu[0] in READ_FUNCTIONS else None
+        if key is not None and key in self.inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self.inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self.inflight[key] = future
+        await self.queue.put((unit, pdu, future, key))
+        return await asyncio.shield(future)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            unit, pdu, future, key = await self.queue.get()
+            try:
+                response = await loop.run_in_executor(self.executor, self.transact, unit, pdu)
+            except Exception:
+                response = exception_pdu(pdu[0], PATH_UNAVAILABLE)
+            finally:
+                if key is not None and self.inflight.get(key) is future:
+                    del self.inflight[key]
+            self.transactions += 1
+            if self.cache is not None:
+                self.update_cache(unit, pdu, response)
+            if pdu[0] in WRITE_FUNCTIONS:
+                self.writes[unit] -= 1
+                if not self.writes[unit]:
+                    del self.writes[unit]
+            if not future.done():
+                future.set_result(response)
+
+    def update_cache(self, unit, pdu, response):
+        if pdu[0] in WRITE_FUNCTIONS:
+            self.cache.invalidate(unit)
+        elif self.writes.get(unit):
+            return                  # Read from before a queued write: its registers may be about to change
+        elif len(pdu) == 5 and pdu[0] == 3 and response and response[0] == 3:
+            address, count = struct.unpack(">HH", pdu[1:])
+            if response[1] == 2 * count:
+                self.cache.store(unit, address, count, struct.unpack(f">{count}H", response[2:]))
+
+    def transact(self, unit, pdu):
+        """Blocking: send one RTU request and return the reply PDU."""
+        frame = with_crc(bytes([unit]) + pdu)
+        started = time.perf_counter()
+        self.ser.reset_input_buffer()
+        self.ser.write(frame)
+        if unit == 0:
+            # Broadcast: no reply, just leave the slaves time to act before the next frame
+            self.ser.flush()
+            time.sleep(frame_gap(self.baud, self.parity, self.stop) + TURNAROUND)
+            self.record(unit, pdu, started, len(frame), 0, OK)
+            return None
+
+        reply = read_reply(self.ser)
+        if len(reply) < 4 or not check_crc(reply) or reply[0] != unit:
+            self.record(unit, pdu, started, len(frame), len(reply), CRC_ERROR if reply else TIMEOUT)
+            return exception_pdu(pdu[0], TARGET_NO_RESPONSE)
+        if reply[1] & 0x80:
+            self.record(unit, pdu, started, len(frame), len(reply), EXCEPTION, reply[2])
+        else:
+            self.record(unit, pdu, started, len(frame), len(reply), OK)
+        return reply[1:-2]
+
+    def record(self, unit, pdu, started, sent, received, outcome, code=None):
+        if self.stats is not None:
+            self.stats.record(unit, pdu[0], time.perf_counter() - started, sent, received, outcome, code)
+
+
+async def serve_client(bus, reader, writer):
+    """One TCP client; requests are handled concurrently and answered by transaction ID."""
+    lock = asyncio.Lock()
+    tasks = set()
+
+    async def handle(tid, pid, unit, pdu):
+        response = await bus.submit(unit, pdu)
+        if response is None:
+            return
+        async with lock:
+            writer.write(struct.pack(">HHHB", tid, pid, len(response) + 1, unit) + response)
+            await writer.drain()
+
+    try:
+        while True:
+            header = await reader.readexactly(7)
+            tid, pid, length, unit = struct.unpack(">HHHB", header)
+            if not 2 <= length <= 254:
+                break               # Not a Modbus TCP frame (unit + 1..253 byte PDU): drop the client
+            pdu = await reader.readexactly(length - 1)
+            task = asyncio.create_task(handle(tid, pid, unit, pdu))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+
+async def main():
+    try:
+        # Longest reply (125 registers) plus turnaround; a normal reply returns as soon as it is in
+        timeout = response_timeout(BAUDRATE, PARITY, STOPBITS, 8, 255) + SLAVE_GRACE
+        ser = serial.Serial(port=PORT, baudrate=BAUDRATE, parity=PARITY, stopbits=STOPBITS, bytesize=8,
+                            timeout=timeout)
+    except serial.SerialException as e:
+        print(f"❌ Cannot open {PORT}: {e}")
+        return
+
+    cache = RegisterCache(CACHE_GROUPS) if CACHE_GROUPS is not None else None
+    stats = BusStats(BAUDRATE, PARITY, STOPBITS)
+    bus = RtuBus(ser, cache=cache, stats=stats)
+    bus_task = asyncio.create_task(bus.run())
+    server = await asyncio.start_server(lambda r, w: serve_client(bus, r, w), GATEWAY_HOST, GATEWAY_PORT)
+    print(f"✅ {PORT} ({BAUDRATE} {PARITY} {STOPBITS}) served as Modbus TCP on {GATEWAY_HOST}:{GATEWAY_PORT}")
+
+    try:
+        async with server:
+            while True:
+                await asyncio.sleep(60)
+                print(f"📊 {bus.requests} requests, {bus.transactions} bus transactions, "
+                      f"{bus.coalesced} merged, {bus.queue.qsize()} queued")
+                if cache is not None:
+                    c = cache.stats()
+                    print(f"   Cache: {c['hits']} hits, {c['misses']} misses ({c['hit_rate']:.0%}), "
+                          f"{c['entries']} blocks, {c['evictions']} evicted")
+                print(format_report(stats.snapshot()))
+    finally:
+        bus_task.cancel()
+        ser.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🔚 Gateway stopped.")
@@ -0,0 +1,125 @@
+import struct
+
+# Modbus RTU framing and line-timing helpers shared by the scanners and pollers.
+
+# --- Timing allowances ---
+RESPONSE_DELAY = 0.01 # Fuji y09 (response interval) factory default, seconds
+PROCESSING = 0.04     # Slave processing time on top of y09
+TURNAROUND = RESPONSE_DELAY + PROCESSING   # Slave response delay allowance in seconds
+USB_LATENCY = 0.02    # USB-RS485 adapters hold bytes up to ~16 ms before passing them on (0 for a native port)
+
+# --- Probe outcomes ---
+OK = "ok"             # Valid reply (data or exception) — settings and ID are right
+SILENT = "silent"     # Nothing came back within the timeout
+GARBAGE = "garbage"   # Bytes arrived but not a valid frame — baud/parity is wrong
+
+
+def _make_crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC_TABLE = _make_crc_table()
+
+
+def crc16(data):
+    """Modbus CRC-16 (poly 0xA001, init 0xFFFF)."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def with_crc(body):
+    """Append the CRC (low byte first, as sent on the wire)."""
+    return bytes(body) + crc16(body).to_bytes(2, "little")
+
+
+def check_crc(frame):
+    """True if the last two bytes are a valid CRC of the rest."""
+    return len(frame) >= 4 and crc16(frame[:-2]) == int.from_bytes(frame[-2:], "little")
+
+
+def read_request(device_id, address, count, function=3):
+    """RTU frame for a read (FC3 holding / FC4 input registers)."""
+    return with_crc(struct.pack(">BBHH", device_id, function, address, count))
+
+
+def char_time(baud, parity="E", stop=1):
+    """Seconds per character: start + 8 data + parity + stop bits."""
+    bits = 1 + 8 + (0 if parity == "N" else 1) + stop
+    return bits / baud
+
+
+def frame_gap(baud, parity="E", stop=1):
+    """3.5 character silent interval (fixed 1.75 ms above 19200 bps, per the RTU spec)."""
+    if baud > 19200:
+        return 0.00175
+    return 3.5 * char_time(baud, parity, stop)
+
+
+def turnaround(response_delay=RESPONSE_DELAY):
+    """Slave turnaround allowance for a drive's configured response delay (y09, seconds)."""
+    return response_delay + PROCESSING
+
+
+def response_timeout(baud, parity="E", stop=1, request_len=8, response_len=7, turnaround=TURNAROUND,
+                     usb_latency=USB_LATENCY):
+    """Time from writing a request until the whole reply should be in.
+
+    Wire time of both frames and their gaps, plus the slave's turnaround
+    (raise it with turnaround(y09) for a drive with a longer response delay)
+    and the adapter's latency.
+    """
+    c = char_time(baud, parity, stop)
+    wire = (request_len + response_len) * c + 2 * frame_gap(baud, parity, stop)
+    return wire + turnaround + usb_latency
+
+
+def probe(ser, device_id, address=1):
+    """Read one holding register over an open pyserial port; return OK, SILENT or GARBAGE.
+
+    Open the port with timeout=response_timeout(...) for its line settings.
+    """
+    ser.reset_input_buffer()
+    ser.write(read_request(device_id, address, 1))
+    reply = read_reply(ser)
+    if not reply:
+        return SILENT
+    if reply[0] == device_id and reply[1] & 0x7F == 3 and check_crc(reply):
+        return OK          # Data or exception reply: the slave is there
+    return GARBAGE
+
+
+def read_reply(ser):
+    """Read one RTU reply frame from an open pyserial port (b"" if the slave stayed silent).
+
+    The frame length is worked out from the function code, so the read returns
+    as soon as the last byte is in; the port's own timeout only matters when
+    the slave stays silent or the frame is cut short. An unexpected function
+    code means the reply is garbled (wrong baud/parity) and is returned at
+    once, without waiting for the rest. Set the timeout once when opening
+    the port (changing it later reconfigures the port on every call).
+    """
+    head = ser.read(1)
+    if not head:
+        return head
+    head += ser.read(1)
+    if len(head) < 2:
+        return head
+    fc = head[1]
+    if fc & 0x80:
+        return head + ser.read(3)                  # Exception: code + CRC
+    if fc in (1, 2, 3, 4, 23):
+        count = ser.read(1)
+        if count and count[0] > 250:
+            return head + count                    # No reply is that long: garbled
+        return head + count + (ser.read(count[0] + 2) if count else b"")
+    if fc in (5, 6, 15, 16):
+        return head + ser.read(6)                  # Echo of address/value or quantity + CRC
+    return head                                    # Not a function we send: garbled, don't wait out the timeout
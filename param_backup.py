@@ -0,0 +1,375 @@
+from pymodbus.client import ModbusSerialClient
+from pymodbus.exceptions import ModbusException, ModbusIOException
+import glob
+import json
+import os
+import sys
+import time
+
+from profiles import load_profiles, PROFILE_FILE
+from read_planner import bridge_limit, plan_reads, read_plan
+from register_map import read_block, map_registers, merge_ranges, invalid_ranges, load_map, NoReply
+
+# Backs up and restores the function-code parameters of every drive on the bus:
+#
+#   python param_backup.py backup                      # every drive in devices.json, one pass
+#   python param_backup.py diff OLD.json NEW.json
+#   python param_backup.py restore SNAPSHOT.json [ID ...]
+#
+# Backups read each parameter range in the largest legal blocks (125 registers),
+# so a drive costs one read per function-code group. A restore reads the drive
+# once, writes only the registers that differ from the snapshot (consecutive
+# ones together, one FC16 per run) and reads them all back in a few blocks.
+
+# === BACKUP SETTINGS ===
+PROFILE = PROFILE_FILE   # Port, line settings, model and device IDs
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backups")
+
+# Fuji function-code groups: Modbus address = group * 256 + code number
+PARAM_GROUPS = [
+    ("F", 0x00, 100),    # Fundamental functions
+    ("E", 0x01, 100),    # Extension terminal functions
+    ("C", 0x02, 100),    # Control functions
+    ("P", 0x03, 100),    # Motor parameters
+    ("H", 0x04, 100),    # High performance functions
+]
+
+MAX_READ = 125           # FC3 limit per request
+MAX_WRITE = 123          # FC16 limit per request
+
+
+def code_name(address):
+    """Fuji function code for a parameter address, e.g. 259 -> 'E03'."""
+    group, number = divmod(address, 256)
+    for letter, g, _ in PARAM_GROUPS:
+        if g == group:
+            return f"{letter}{number:02d}"
+    return str(address)
+
+
+def param_windows(groups=PARAM_GROUPS):
+    return [[g * 256, g * 256 + n] for _, g, n in groups]
+
+
+def clip_ranges(ranges, windows):
+    """Parts of the valid ranges that fall inside the windows."""
+    clipped = []
+    for lo, hi in windows:
+        for r_lo, r_hi in ranges:
+            a, b = max(lo, r_lo), min(hi, r_hi)
+            if a < b:
+                clipped.append([a, b])
+    return merge_ranges(sorted(a for lo, hi in clipped for a in range(lo, hi)))
+
+
+def known_ranges(model, windows):
+    """Readable parameter ranges from the latest backup or the saved register map (None if unknown)."""
+    latest = latest_snapshot(model)
+    if latest is not None:
+        return load_snapshot(latest)["ranges"]
+    saved = load_map(model)
+    if saved is not None:
+        valid, start, end = saved
+        if all(start <= lo and hi <= end for lo, hi in windows):
+            return clip_ranges(valid, windows)
+    return None
+
+
+def answers(client, device_id, address):
+    """True if the drive replies at all (data or a Modbus exception)."""
+    try:
+        client.read_holding_registers(address=address, count=1, device_id=device_id)
+    except ModbusException:
+        return False
+    return True
+
+
+def read_params(client, device_id, ranges):
+    """Read the ranges in MAX_READ blocks; returns ({address: raw}, reads, answered)."""
+    values = {}
+    reads = 0
+    for start, end in ranges:
+        for addr in range(start, end, MAX_READ):
+            count = min(MAX_READ, end - addr)
+            reads += 1
+            regs = read_block(client, device_id, addr, count)
+            if regs is not None:
+                values.update(zip(range(addr, addr + count), regs))
+                continue
+            reads += 1
+            if not answers(client, device_id, addr):
+                return values, reads, False
+            # Ranges out of date for this drive: bisect this block only
+            try:
+                _, found, n = map_registers(client, device_id, addr, addr + count, MAX_READ)
+            except NoReply as e:
+                return values, reads + e.transactions, False
+            values.update(found)
+            reads += n
+    return values, reads, True
+
+
+def backup(client, device_ids, model, windows=None):
+    """Read every drive's parameters in one pass; returns (snapshot, reads).
+
+    The readable ranges come from the last backup or the register map; without
+    either, the first drive that answers is mapped by bisection and the others
+    reuse its ranges.
+    """
+    windows = windows or param_windows()
+    ranges = known_ranges(model, windows)
+    devices = {}
+    reads = 0
+    for device_id in device_ids:
+        if ranges is None:
+            reads += 1
+            if not answers(client, device_id, windows[0][0]):
+                print(f"⚠️ ID {device_id}: no answer, skipped")
+                continue
+            found = {}
+            try:
+                for lo, hi in windows:
+                    _, values, n = map_registers(client, device_id, lo, hi, MAX_READ)
+                    found.update(values)
+                    reads += n
+            except NoReply as e:
+                reads += e.transactions
+                print(f"⚠️ ID {device_id}: stopped answering, skipped")
+                continue
+            ranges = merge_ranges(sorted(found))
+        else:
+            found, n, answered = read_params(client, device_id, ranges)
+            reads += n
+            if not answered:
+                print(f"⚠️ ID {device_id}: no answer, skipped")
+                continue
+        devices[device_id] = [found.get(a) for lo, hi in ranges for a in range(lo, hi)]
+        missing = devices[device_id].count(None)
+        print(f"✅ ID {device_id}: {len(found)} parameters" + (f" ({missing} unreadable)" if missing else ""))
+
+    snapshot = {
+        "model": model,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "ranges": ranges or [],
+        "devices": devices,
+    }
+    return snapshot, reads
+
+
+def snapshot_values(snapshot, device_id):
+    """{address: raw} for one drive of a snapshot (unreadable parameters left out)."""
+    flat = snapshot["devices"].get(device_id, [])
+    addresses = (a for lo, hi in snapshot["ranges"] for a in range(lo, hi))
+    return {a: v for a, v in zip(addresses, flat) if v is not None}
+
+
+def save_snapshot(snapshot, directory=BACKUP_DIR):
+    """Write backups/<model>-<timestamp>.json: shared ranges, one flat value list per drive."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{snapshot['model']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    lines = [
+        "{",
+        f'  "model": {json.dumps(snapshot["model"])},',
+        f'  "created": {json.dumps(snapshot["created"])},',
+        f'  "ranges": {json.dumps(snapshot["ranges"])},',
+        '  "devices": {',
+        ",\n".join(f'    "{d}": {json.dumps(v, separators=(",", ":"))}' for d, v in snapshot["devices"].items()),
+        "  }",
+        "}",
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def load_snapshot(path):
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    snapshot["devices"] = {int(d): v for d, v in snapshot["devices"].items()}
+    return snapshot
+
+
+def latest_snapshot(model, directory=BACKUP_DIR):
+    paths = sorted(glob.glob(os.path.join(directory, f"{glob.escape(model)}-*.json")))
+    return paths[-1] if paths else None
+
+
+def diff_snapshots(old, new):
+    """[(device_id, address, old raw, new raw)]; None where a side has no value."""
+    changes = []
+    for device_id in sorted(set(old["devices"]) | set(new["devices"])):
+        a = snapshot_values(old, device_id)
+        b = snapshot_values(new, device_id)
+        for address in sorted(set(a) | set(b)):
+            if a.get(address) != b.get(address):
+                changes.append((device_id, address, a.get(address), b.get(address)))
+    return changes
+
+
+def print_diff(changes, old_label, new_label):
+    print(f"\n🔍 {old_label} → {new_label}")
+    if not changes:
+        print("   no parameter changes")
+    for device_id, address, old, new in changes:
+        old = "-" if old is None else old
+        new = "-" if new is None else new
+        print(f"   ID {device_id:>3} {code_name(address):>5} (addr {address:>4}): {old:>6} → {new}")
+
+
+def write_runs(addresses, max_count=MAX_WRITE):
+    """Consecutive addresses -> [(start, count)] with count <= max_count."""
+    runs = []
+    for lo, hi in merge_ranges(sorted(addresses)):
+        runs.extend((a, min(max_count, hi - a)) for a in range(lo, hi, max_count))
+    return runs
+
+
+def write_run(client, device_id, start, values, failed):
+    """Write one run; if the drive rejects it, split it in half until the refused addresses are isolated.
+
+    Single registers go out as FC6. A timeout is not split (the drive is
+    not refusing, it is not answering). Refused addresses are appended to
+    `failed`; returns the number of transactions.
+    """
+    try:
+        if len(values) == 1:
+            rr = client.write_register(start, values[0], device_id=device_id)
+        else:
+            rr = client.write_registers(start, values, device_id=device_id)
+    except ModbusIOException:
+        failed.extend(range(start, start + len(values)))
+        return 1
+    except ModbusException:
+        rr = None
+    if rr is not None and not rr.isError():
+        return 1
+    if len(values) == 1 or rr is None:
+        failed.extend(range(start, start + len(values)))
+        return 1
+    half = len(values) // 2
+    return (1 + write_run(client, device_id, start, values[:half], failed)
+            + write_run(client, device_id, start + half, values[half:], failed))
+
+
+def restore(client, snapshot, device_id, max_gap=None):
+    """Write the registers that differ from the snapshot and read them back.
+
+    Returns (written, failed, transactions): failed lists the addresses that
+    were rejected or read back wrong. Raises ModbusIOException if the drive
+    does not answer.
+    """
+    wanted = snapshot_values(snapshot, device_id)
+    current, transactions, answered = read_params(client, device_id, snapshot["ranges"])
+    if not answered:
+        raise ModbusIOException(f"Device {device_id} did not answer")
+    changed = sorted(a for a, v in wanted.items() if current.get(a) != v)
+    failed = []
+    for start, count in write_runs(changed):
+        transactions += write_run(client, device_id, start, [wanted[a] for a in range(start, start + count)],
+                                  failed)
+
+    rejected = set(failed)
+    written = [a for a in changed if a not in rejected]
+    if written:
+        # Verify in as few reads as the readable ranges allow (bridging only through parameters)
+        lo, hi = snapshot["ranges"][0][0], snapshot["ranges"][-1][1]
+        plan = plan_reads(written, max_gap=max_gap if max_gap is not None else bridge_limit(),
+                          illegal=invalid_ranges(snapshot["ranges"], lo, hi), max_count=MAX_READ)
+        transactions += len(plan)
+        readback = read_plan(client, device_id, plan, written)
+        failed.extend(a for a in written if readback.get(a) != wanted[a])
+    return written, sorted(set(failed)), transactions
+
+
+def open_client(config):
+    return ModbusSerialClient(
+        port=config["port"],
+        baudrate=config.get("baudrate", 9600),
+        parity=config.get("parity", "E"),
+        stopbits=config.get("stopbits", 1),
+        bytesize=8,
+        timeout=config.get("timeout", 1),
+    )
+
+
+def connect(config):
+    client = open_client(config)
+    print(f"🔌 Connecting to {config['port']}...")
+    if not client.connect():
+        print("❌ Connection failed. Check COM port & wiring.")
+        raise SystemExit(1)
+    return client
+
+
+def main_backup(profile=PROFILE):
+    config = load_profiles(profile)
+    model = config.get("model", "FRENIC")
+    device_ids = [d["id"] for d in config["devices"]]
+    previous = latest_snapshot(model)
+
+    client = connect(config)
+    started = time.monotonic()
+    try:
+        snapshot, reads = backup(client, device_ids, model)
+    finally:
+        client.close()
+    elapsed = time.monotonic() - started
+    if not snapshot["devices"]:
+        print("❌ No drive answered, nothing saved.")
+        return
+
+    path = save_snapshot(snapshot)
+    n = sum(len(v) for v in snapshot["devices"].values())
+    print(f"\n📊 {len(snapshot['devices'])} drives, {n} parameters in {reads} reads, {elapsed:.1f} s")
+    print(f"💾 Saved {path}")
+    if previous is not None:
+        print_diff(diff_snapshots(load_snapshot(previous), snapshot), os.path.basename(previous),
+                   os.path.basename(path))
+
+
+def main_diff(old_path, new_path):
+    print_diff(diff_snapshots(load_snapshot(old_path), load_snapshot(new_path)),
+               os.path.basename(old_path), os.path.basename(new_path))
+
+
+def main_restore(path, *device_ids, profile=PROFILE):
+    config = load_profiles(profile)
+    snapshot = load_snapshot(path)
+    device_ids = [int(d) for d in device_ids] or sorted(snapshot["devices"])
+    gap = bridge_limit(config.get("baudrate", 9600), config.get("parity", "E"), config.get("stopbits", 1))
+
+    client = connect(config)
+    try:
+        for device_id in device_ids:
+            if device_id not in snapshot["devices"]:
+                print(f"⚠️ ID {device_id}: not in {os.path.basename(path)}")
+                continue
+            try:
+                written, failed, transactions = restore(client, snapshot, device_id, gap)
+            except ModbusIOException:
+                print(f"❌ ID {device_id}: no answer")
+                continue
+            if failed:
+                print(f"❌ ID {device_id}: {len(written)} written, {len(failed)} failed: "
+                      + ", ".join(code_name(a) for a in failed))
+            elif written:
+                print(f"✅ ID {device_id}: restored {len(written)} parameters "
+                      f"({', '.join(code_name(a) for a in written)}) in {transactions} transactions")
+            else:
+                print(f"✅ ID {device_id}: already matches the snapshot ({transactions} reads)")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "backup" and len(sys.argv) <= 3:
+        main_backup(*sys.argv[2:])
+    elif command == "diff" and len(sys.argv) == 4:
+        main_diff(*sys.argv[2:])
+    elif command == "restore" and len(sys.argv) >= 3:
+        main_restore(*sys.argv[2:])
+    else:
+        print("Usage: python param_backup.py backup [devices.json]")
+        print("       python param_backup.py diff OLD.json NEW.json")
+        print("       python param_backup.py restore SNAPSHOT.json [ID ...]")
@@ -0,0 +1,202 @@
+from pymodbus.client import AsyncModbusSerialClient
+from datetime import datetime
+import asyncio
+import math
+import time
+
+from async_poller import read_plan_async
+from device_health import HealthMonitor, AsyncHealthClient
+from read_planner import plan_reads, bridge_limit, known_illegal
+
+# === CONNECTION SETTINGS ===
+PORT = "COM4"
+BAUDRATE = 9600
+PARITY = "E"
+STOPBITS = 1
+TIMEOUT = 1
+
+REPORT_EVERY = 30      # Seconds between rate/jitter reports
+
+
+class PollTag:
+    """One group of registers polled at its own period.
+
+    Higher priority wins when several tags are due at once, so on an
+    oversubscribed bus low-priority tags slow down first.
+    """
+
+    def __init__(self, name, device_id, addresses, period, priority=0):
+        self.name = name
+        self.device_id = device_id
+        self.addresses = sorted(addresses)
+        self.period = period
+        self.priority = priority
+        self.next_due = None
+        # Statistics
+        self.reads = 0
+        self.missed = 0              # Whole periods skipped because the bus was busy
+        self.first_read = None
+        self.last_read = None
+        self.late_sum = 0.0
+        self.late_sq_sum = 0.0
+        self.late_max = 0.0
+
+    def record(self, started):
+        """Account for a read that started at `started` against its deadline."""
+        late = max(0.0, started - self.next_due)
+        self.reads += 1
+        self.first_read = self.first_read if self.first_read is not None else started
+        self.last_read = started
+        self.late_sum += late
+        self.late_sq_sum += late * late
+        self.late_max = max(self.late_max, late)
+
+    def advance(self, now):
+        """Move to the next deadline on the fixed grid.
+
+        A deadline that has just passed stays pending (served late); slots a
+        whole period or more in the past are dropped rather than read in a burst.
+        """
+        self.next_due += self.period
+        behind = now - self.next_due
+        if behind >= self.period:
+            skipped = math.floor(behind / self.period)
+            self.missed += skipped
+            self.next_due += skipped * self.period
+
+    def stats(self):
+        span = (self.last_read - self.first_read) if self.reads > 1 else 0.0
+        mean = self.late_sum / self.reads if self.reads else 0.0
+        var = self.late_sq_sum / self.reads - mean * mean if self.reads else 0.0
+        return {
+            "period": self.period,
+            "priority": self.priority,
+            "target_hz": 1.0 / self.period,
+            "achieved_hz": (self.reads - 1) / span if span > 0 else 0.0,
+            "reads": self.reads,
+            "missed": self.missed,
+            "jitter_ms": math.sqrt(max(0.0, var)) * 1000,
+            "mean_late_ms": mean * 1000,
+            "max_late_ms": self.late_max * 1000,
+        }
+
+
+class PollScheduler:
+    """Deadline scheduler for PollTags on one async Modbus client.
+
+    Deadlines sit on a fixed monotonic grid (start + n * period), so the time a
+    read takes never shifts later polls. When a tag is due, any other due tags
+    on the same device are read in the same block plan.
+    """
+
+    def __init__(self, client, tags, on_sample=None, baud=BAUDRATE, parity=PARITY, stop=STOPBITS):
+        self.client = client
+        self.tags = list(tags)
+        self.on_sample = on_sample or print_tag_sample
+        self.max_gap = bridge_limit(baud, parity, stop)
+        self.illegal = known_illegal()
+        self._stopping = False
+
+    async def run(self):
+        start = time.monotonic()
+        for tag in self.tags:
+            tag.next_due = start
+
+        while not self._stopping:
+            now = time.monotonic()
+            due = [t for t in self.tags if t.next_due <= now]
+            if not due:
+                await asyncio.sleep(min(t.next_due for t in self.tags) - now)
+                continue
+
+            # Highest priority first; among equals the most overdue one
+            lead = min(due, key=lambda t: (-t.priority, t.next_due))
+            batch = [t for t in due if t.device_id == lead.device_id]
+            await self.poll(lead.device_id, batch, now)
+
+            done = time.monotonic()
+            for tag in batch:
+                tag.advance(done)
+
+    async def poll(self, device_id, batch, started):
+        wanted = sorted({a for t in batch for a in t.addresses})
+        plan = plan_reads(wanted, max_gap=self.max_gap, illegal=self.illegal)
+        values = await read_plan_async(self.client, device_id, plan, wanted, self.illegal)
+        stamp = time.time()
+        for tag in batch:
+            tag.record(started)
+            self.on_sample(tag, stamp, {a: values[a] for a in tag.addresses if a in values})
+
+    def stop(self):
+        self._stopping = True
+
+    def report(self):
+        return {tag.name: tag.stats() for tag in self.tags}
+
+
+def print_tag_sample(tag, timestamp, values):
+    stamp = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+    if len(values) < len(tag.addresses):
+        print(f"[{stamp}] ⚠️ {tag.name}: Modbus read error.")
+        return
+    regs = "  ".join(f"{addr}={raw:5d}" for addr, raw in values.items())
+    print(f"[{stamp}] {tag.name} (ID {tag.device_id}): {regs}")
+
+
+def print_report(report):
+    print("\n📊 Poll rates:")
+    for name, s in report.items():
+        print(f"  {name:16s} {s['achieved_hz']:6.3f}/{s['target_hz']:6.3f} Hz  "
+              f"jitter={s['jitter_ms']:6.1f} ms  max late={s['max_late_ms']:7.1f} ms  missed={s['missed']}")
+    print()
+
+
+# === TAGS (pymodbus zero-based addresses) ===
+TAGS = [
+    PollTag("temp_rh_7", 7, [2120, 2121], period=2.0, priority=2),
+    PollTag("temp_rh_9", 9, [2120, 2121], period=2.0, priority=2),
+    PollTag("temp_rh_2", 2, [2097, 2102], period=2.0, priority=2),
+    PollTag("temp_rh_4", 4, [2097, 2102], period=2.0, priority=2),
+    PollTag("m49_m54_2", 2, [2999, 3004], period=10.0, priority=1),
+    PollTag("m49_m54_4", 4, [2999, 3004], period=10.0, priority=1),
+]
+
+
+async def main():
+    client = AsyncModbusSerialClient(
+        port=PORT,
+        baudrate=BAUDRATE,
+        parity=PARITY,
+        stopbits=STOPBITS,
+        bytesize=8,
+        timeout=TIMEOUT,
+    )
+
+    print("🔌 Connecting to shared RS-485 bus...")
+    if not await client.connect():
+        print("❌ Connection failed.")
+        return
+    print(f"✅ Connected. Scheduling {len(TAGS)} tags...\n")
+
+    health = HealthMonitor({tag.device_id for tag in TAGS})
+    scheduler = PollScheduler(AsyncHealthClient(client, health), TAGS)
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(REPORT_EVERY)
+            print_report(scheduler.report())
+
+    report_task = asyncio.create_task(reporter())
+    try:
+        await scheduler.run()
+    finally:
+        report_task.cancel()
+        client.close()
+        print_report(scheduler.report())
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🔚 Stopped by user.")
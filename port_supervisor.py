@@ -0,0 +1,357 @@
+from multiprocessing import shared_memory
+from datetime import datetime
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from acquire import Acquisition, make_client
+from device_health import HealthMonitor, AsyncHealthClient
+from profiles import load_profiles, compile_profiles, PROFILE_FILE
+from ring_store import RECORD_DTYPE, GOOD, FAILED
+
+# One worker process per RS-485 segment (serial port), all publishing into one
+# shared-memory table the supervisor (or any reader) can snapshot:
+#
+#   python port_supervisor.py site_a.json site_b.json     # one devices.json-style profile per port
+#
+# Each worker runs its own Acquisition loop, so segments poll in parallel and
+# no single Python loop caps the total rate.
+#
+# The table lives under a fixed name (TABLE_NAME) and its layout — the row keys
+# and each segment's row range — is published next to it in a JSON sidecar,
+# so other processes can attach and read it. A worker checks its compiled
+# profile against its published rows and refuses to start if they differ
+# (e.g. the profile was edited): restart the supervisor to lay the table out again.
+# The sidecar also records the supervisor's pid; a second supervisor refuses
+# the table while that process is alive, and only takes over a killed one's.
+
+# === SUPERVISOR SETTINGS ===
+PROFILES = [PROFILE_FILE]  # Default when no profiles are given on the command line
+RESTART_DELAY = 5.0        # Seconds before a crashed worker is started again
+PRINT_EVERY = 10           # Seconds between printed snapshots
+TABLE_NAME = "modbus_segments"                 # Shared-memory block name
+LAYOUT_DIR = tempfile.gettempdir()             # Where the <TABLE_NAME>.json layout sidecar is written
+LAYOUT_MISMATCH = 3                            # Worker exit code: profile no longer matches its rows
+
+
+def _alive(pid):
+    """True if process `pid` is still running."""
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)        # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259                                  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _attach(name):
+    """Open an existing block without making this process responsible for unlinking it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)      # Python 3.13+
+    except TypeError:
+        # Workers share the supervisor's resource tracker, which already knows the block
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedTable:
+    """Latest sample per (port, device, tag) in shared memory.
+
+    Layout: one seq counter (uint64) per segment, then one RECORD_DTYPE row per
+    key. Each segment's worker is the only writer of its rows and brackets every
+    write with its seq counter (odd while writing), so a reader that sees every
+    counter even and unchanged across its copy has a snapshot that is consistent
+    across all segments.
+    """
+
+    def __init__(self, shm, n_segments, n_rows, owner=False):
+        self.shm = shm
+        self.name = shm.name
+        self.n_segments = n_segments
+        self.n_rows = n_rows
+        self.owner = owner
+        self.seq = np.ndarray((n_segments,), dtype=np.uint64, buffer=shm.buf)
+        self.rows = np.ndarray((n_rows,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=8 * n_segments)
+
+    @staticmethod
+    def size(n_segments, n_rows):
+        return 8 * n_segments + max(1, n_rows) * RECORD_DTYPE.itemsize
+
+    @classmethod
+    def create(cls, n_segments, n_rows, name=TABLE_NAME):
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size(n_segments, n_rows))
+        except FileExistsError:
+            owner = table_owner(name)
+            if owner is not None and owner != os.getpid() and _alive(owner):
+                raise RuntimeError(f"Shared table {name} is in use by supervisor pid {owner}; "
+                                   f"stop it first or set another TABLE_NAME")
+            # Left behind by a supervisor that was killed: take the name over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size(n_segments, n_rows))
+        table = cls(shm, n_segments, n_rows, owner=True)
+        table.seq[:] = 0
+        table.rows[:] = 0
+        table.rows["value"] = np.nan
+        table.rows["flags"] = FAILED
+        return table
+
+    @classmethod
+    def attach(cls, name, n_segments, n_rows):
+        return cls(_attach(name), n_segments, n_rows)
+
+    # --- Writer (one per segment) ---
+
+    def write(self, segment, start, t, values, raw, flags):
+        end = start + len(values)
+        self.seq[segment] += 1           # Odd: write in progress
+        self.rows["t"][start:end] = t
+        self.rows["value"][start:end] = values
+        self.rows["raw"][start:end] = raw
+        self.rows["flags"][start:end] = flags
+        self.seq[segment] += 1           # Even: consistent again
+
+    # --- Reader ---
+
+    def snapshot(self, retries=1000):
+        """Consistent copy of every row."""
+        for _ in range(retries):
+            before = self.seq.copy()
+            if (before & 1).any():
+                time.sleep(0)
+                continue
+            data = self.rows.copy()
+            if np.array_equal(self.seq, before):
+                return data
+        raise RuntimeError(f"{self.name}: writers kept the table busy, no consistent snapshot")
+
+    def close(self):
+        # Drop the numpy views first; the buffer cannot be closed while they exist
+        self.seq = self.rows = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def segment_keys(config, devices=None):
+    """Row keys [port, device_id, tag] of one segment, in row order."""
+    devices = compile_profiles(config) if devices is None else devices
+    return [[config["port"], dev.device_id, name] for dev in devices for name in dev.tag_names]
+
+
+def segment_layout(configs):
+    """Row keys of every segment back to back, and each segment's [start, end) row range."""
+    keys = []
+    ranges = []
+    for config in configs:
+        start = len(keys)
+        keys.extend(segment_keys(config))
+        ranges.append([start, len(keys)])
+    return keys, ranges
+
+
+def layout_path(name=TABLE_NAME):
+    return os.path.join(LAYOUT_DIR, f"{name}.json")
+
+
+def publish_layout(name, paths, configs, keys, ranges):
+    """Write the table's layout sidecar (atomically, so readers never see half of it)."""
+    layout = {
+        "name": name,
+        "pid": os.getpid(),          # Owner: another supervisor will not take the table over while it runs
+        "n_segments": len(ranges),
+        "n_rows": len(keys),
+        "segments": [{"port": c["port"], "profile": os.path.abspath(p), "rows": r}
+                     for p, c, r in zip(paths, configs, ranges)],
+        "keys": keys,
+    }
+    tmp = layout_path(name) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(layout, f)
+    os.replace(tmp, layout_path(name))
+    return layout
+
+
+def load_layout(name=TABLE_NAME):
+    with open(layout_path(name)) as f:
+        return json.load(f)
+
+
+def table_owner(name=TABLE_NAME):
+    """Pid of the supervisor that published the table's layout (None if there is no readable sidecar)."""
+    try:
+        return load_layout(name).get("pid")
+    except (OSError, ValueError):
+        return None
+
+
+def attach_table(name=TABLE_NAME):
+    """(SharedTable, layout) for a running supervisor's table, from its published layout."""
+    layout = load_layout(name)
+    return SharedTable.attach(name, layout["n_segments"], layout["n_rows"]), layout
+
+
+def run_segment(path, table_name, segment):
+    """Worker process: poll one profile's port and publish every device into the table."""
+    try:
+        code = asyncio.run(_segment_main(path, table_name, segment))
+    except KeyboardInterrupt:
+        code = 0
+    sys.exit(code)
+
+
+async def _segment_main(path, table_name, segment):
+    config = load_profiles(path)
+    devices = compile_profiles(config)
+    layout = load_layout(table_name)
+    start, end = layout["segments"][segment]["rows"]
+    if segment_keys(config, devices) != layout["keys"][start:end]:
+        print(f"❌ {config['port']}: {path} no longer matches rows {start}-{end} of the shared table. "
+              f"Restart the supervisor to lay the table out again.")
+        return LAYOUT_MISMATCH
+    table = SharedTable.attach(table_name, layout["n_segments"], layout["n_rows"])
+    start_row = {}
+    for dev in devices:
+        start_row[dev.device_id] = start
+        start += len(dev.tags)
+    flags = {dev.device_id: np.empty(len(dev.tags), dtype=np.uint32) for dev in devices}
+
+    def publish(dev, timestamp):
+        f = flags[dev.device_id]
+        f[:] = np.where(dev.tag_ok(), GOOD, FAILED)
+        table.write(segment, start_row[dev.device_id], timestamp, dev.values, dev.tag_raw(), f)
+
+    client = make_client(config)
+    if not await client.connect():
+        print(f"❌ {config['port']}: connection failed.")
+        table.close()
+        return 1
+    print(f"✅ {config['port']}: polling {len(devices)} drives")
+    client = AsyncHealthClient(client, HealthMonitor(dev.device_id for dev in devices))
+    acquisition = Acquisition(client, devices, cycle=config.get("cycle", 2), on_values=publish)
+    try:
+        await acquisition.run()
+    finally:
+        client.close()
+        table.close()
+    return 0
+
+
+class PortSupervisor:
+    """Starts one run_segment process per profile and restarts any that die."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.configs = [load_profiles(p) for p in self.paths]
+        ports = [c["port"] for c in self.configs]
+        if len(set(ports)) != len(ports):
+            raise ValueError(f"Each profile needs its own port, got {ports}")
+        keys, self.ranges = segment_layout(self.configs)
+        self.keys = [tuple(k) for k in keys]
+        self.table = SharedTable.create(len(self.paths), len(self.keys))
+        self.layout = publish_layout(self.table.name, self.paths, self.configs, keys, self.ranges)
+        self.processes = [None] * len(self.paths)
+        self.died_at = [None] * len(self.paths)
+
+    def start_worker(self, segment):
+        process = multiprocessing.Process(
+            target=run_segment,
+            args=(self.paths[segment], self.table.name, segment),
+            name=f"segment-{self.configs[segment]['port']}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[segment] = process
+        self.died_at[segment] = None
+
+    def start(self):
+        for segment in range(len(self.paths)):
+            self.start_worker(segment)
+
+    def check(self):
+        """Restart workers that exited, RESTART_DELAY after noticing."""
+        now = time.monotonic()
+        for segment, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self.died_at[segment] is None:
+                self.died_at[segment] = now
+                if self.table.seq[segment] % 2:
+                    self.table.seq[segment] += 1     # Killed mid-write: unblock the readers
+                print(f"⚠️ Worker for {self.configs[segment]['port']} exited (code {process.exitcode})")
+                if process.exitcode == LAYOUT_MISMATCH:
+                    self.died_at[segment] = float("inf")   # Its profile changed: not restarted
+            elif now - self.died_at[segment] >= RESTART_DELAY:
+                print(f"🔁 Restarting worker for {self.configs[segment]['port']}")
+                self.start_worker(segment)
+
+    def snapshot(self):
+        """{(port, device_id, tag): (timestamp, value, flags)} across every segment at one instant."""
+        rows = self.table.snapshot()
+        return {key: (float(r["t"]), float(r["value"]), int(r["flags"])) for key, r in zip(self.keys, rows)}
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join()
+        self.table.close()
+        if table_owner(self.table.name) == os.getpid():
+            try:
+                os.remove(layout_path(self.table.name))
+            except OSError:
+                pass
+
+
+def print_snapshot(snapshot):
+    print(f"\n[{datetime.now():%H:%M:%S}]")
+    for (port, device_id, tag), (t, value, flags) in snapshot.items():
+        shown = "  err" if flags != GOOD or t == 0 else f"{value:7.2f}"
+        print(f"   {port:>8} ID {device_id:>3} {tag:<16} {shown}")
+
+
+def main(paths):
+    try:
+        supervisor = PortSupervisor(paths)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    print(f"🚀 {len(paths)} segment(s), {len(supervisor.keys)} tags in shared table {supervisor.table.name}")
+    supervisor.start()
+    next_print = time.monotonic() + PRINT_EVERY
+    try:
+        while True:
+            time.sleep(1)
+            supervisor.check()
+            if time.monotonic() >= next_print:
+                next_print += PRINT_EVERY
+                print_snapshot(supervisor.snapshot())
+    finally:
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    try:
+        main(sys.argv[1:] or PROFILES)
+    except KeyboardInterrupt:
+        print("\n🔚 Supervisor stopped.")
@@ -0,0 +1,141 @@
+import json
+import os
+
+import numpy as np
+
+from decode import register_count, check_spec, word_columns
+from read_planner import plan_reads, bridge_limit, known_illegal, bridged_gaps
+from scaling import ScalingTable, linear_coeffs
+
+# Per-device profiles (ID, registers, data format, calibration) from one config
+# file, compiled once into a read plan and a conversion table per device.
+#
+# Calibrations from the old per-drive scripts map onto the formats in scaling.py:
+#   temp3.py  (raw + 2990) * 60 / 16000  -> {"format": "factor", "scale": 0.00375, "offset": 11.2125}
+#   temp4.py  raw * 0.00327 - 5.35       -> {"format": "factor", "scale": 0.00327, "offset": -5.35}
+#   temp10.py raw * TEMP_SCALE           -> {"format": "factor", "scale": 0.001755}
+
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "devices.json")
+
+
+class CompiledDevice:
+    """One drive's profile, ready for the hot path.
+
+    Raw registers land in `raw` (one uint16 slot per register of every block
+    in `plan`, blocks back to back); `table` picks the tag columns out of it
+    and scales them in one pass.
+    """
+
+    def __init__(self, device_id, name, tags, plan, max_gap=None, illegal=None):
+        self.device_id = device_id
+        self.name = name
+        self.tags = tags
+        self.tag_names = [t["name"] for t in tags]
+        self.addresses = sorted({a for t in tags for a in range(t["address"], t["address"] + register_count(t))})
+        self.max_gap = max_gap
+        self.illegal = list(illegal or [])
+        self.values = np.full(len(tags), np.nan)
+        n = len(tags)
+        self.words = np.zeros(n, dtype=np.uint32)   # Per-tag buffers reused every poll (tag_raw / tag_ok)
+        self.good = np.zeros(n, dtype=bool)
+        self._hi_words = np.zeros(n, dtype=np.uint16)
+        self._lo_words = np.zeros(n, dtype=np.uint16)
+        self._last_ok = np.zeros(n, dtype=bool)
+        self.timestamp = None                    # Unix time of the last poll
+        self.raw = self.ok = None
+        self._layout(plan)
+
+    def _layout(self, plan):
+        """Slots, tag columns and buffers for a plan; registers already read keep their values."""
+        old_slot, old_raw, old_ok = getattr(self, "slot", {}), self.raw, self.ok
+        self.plan = plan
+        self.offsets = []
+        self.slot = {}
+        pos = 0
+        for start, count in plan:
+            self.offsets.append(pos)
+            for i in range(count):
+                self.slot[start + i] = pos + i
+            pos += count
+        tags = self.tags
+        self.columns = np.array([self.slot[t["address"]] for t in tags], dtype=np.intp)
+        # Slot of each tag's last register (blocks are back to back, so a tag's registers are adjacent)
+        self.last_columns = np.array([self.slot[t["address"] + register_count(t) - 1] for t in tags],
+                                     dtype=np.intp)
+        self.table = ScalingTable(tags, columns=self.columns)
+        self.hi, self.lo, self.shift = word_columns(tags, self.columns)
+        self.raw = np.zeros(pos, dtype=np.uint16)
+        self.ok = np.zeros(pos, dtype=bool)      # Slots filled by the last successful read
+        for address, slot in old_slot.items():
+            if address in self.slot:
+                self.raw[self.slot[address]] = old_raw[slot]
+                self.ok[self.slot[address]] = old_ok[slot]
+
+    def drop_bridge(self, index):
+        """Block `index` was rejected with code 2: mark its bridged gaps illegal and re-plan.
+
+        Returns False if the block bridges nothing (a tag register itself is illegal).
+        """
+        start, count = self.plan[index]
+        gaps = bridged_gaps(start, count, self.addresses)
+        if not gaps:
+            return False
+        self.illegal.extend(gaps)
+        max_gap = bridge_limit() if self.max_gap is None else self.max_gap
+        self._layout(plan_reads(self.addresses, max_gap=max_gap, illegal=self.illegal))
+        return True
+
+    def store_block(self, index, registers):
+        """Copy one block's registers into the raw buffer (None = read failed)."""
+        off = self.offsets[index]
+        count = self.plan[index][1]
+        if registers is None:
+            self.ok[off:off + count] = False
+        else:
+            self.raw[off:off + count] = registers
+            self.ok[off:off + count] = True
+
+    def tag_ok(self):
+        """Per tag: True if every register of it came from a successful read (in self.good)."""
+        np.take(self.ok, self.columns, out=self.good)
+        np.take(self.ok, self.last_columns, out=self._last_ok)
+        self.good &= self._last_ok
+        return self.good
+
+    def tag_raw(self):
+        """Per tag: its undecoded register word as uint32 (both words of a 32-bit tag, in self.words)."""
+        np.take(self.raw, self.hi, out=self._hi_words)
+        np.take(self.raw, self.lo, out=self._lo_words)
+        np.left_shift(self._hi_words, self.shift, out=self.words)
+        self.words |= self._lo_words
+        return self.words
+
+    def process(self):
+        """Scale the raw buffer into self.values; tags whose block failed become NaN."""
+        self.table.convert(self.raw, out=self.values)
+        self.values[~self.tag_ok()] = np.nan
+        return self.values
+
+    def as_dict(self):
+        return dict(zip(self.tag_names, self.values.tolist()))
+
+
+def load_profiles(path=PROFILE_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compile_profiles(config):
+    """Build a CompiledDevice per configured drive (validates every tag once)."""
+    max_gap = bridge_limit(config.get("baudrate", 9600), config.get("parity", "E"), config.get("stopbits", 1))
+    illegal = known_illegal(config.get("model", "FRENIC-HVAC"))
+    compiled = []
+    for dev in config["devices"]:
+        tags = dev["tags"]
+        for tag in tags:
+            linear_coeffs(tag)  # Raises on an unknown format or type before anything is polled
+            check_spec(tag)
+        addresses = [a for t in tags for a in range(t["address"], t["address"] + register_count(t))]
+        plan = plan_reads(addresses, max_gap=max_gap, illegal=illegal)
+        compiled.append(CompiledDevice(dev["id"], dev.get("name", f"id{dev['id']}"), tags, plan, max_gap, illegal))
+    return compiled
@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import time
+
+# Read-through cache in front of read_holding_registers. Wrap a client to opt in:
+#
+#   cached = CachedClient(client, groups=[(2097, 2103, 1.0), (2120, 2122, 0.5)])
+#   rr = cached.read_holding_registers(address=2120, count=2, device_id=7)
+#
+# (AsyncCachedClient for the async clients.) Reads that fall inside a fresh
+# cached block of the same device are answered from memory without touching
+# the bus.
+
+DEFAULT_TTL = 0.0      # Seconds a block stays fresh when no group matches (0: only listed groups are cached)
+MAX_ENTRIES = 256      # Cached blocks kept before the least recently used is evicted
+
+
+class CachedResponse:
+    """Stands in for a pymodbus read response built from cached registers."""
+
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class RegisterCache:
+    """Blocks of holding registers keyed by (device_id, start, count), with per-group TTLs.
+
+    groups: list of (start, end, ttl) — registers in [start, end) stay fresh
+    for ttl seconds; a block spanning several groups uses the shortest ttl,
+    and a block reaching outside the groups gets default_ttl (not cached by default).
+    Memory is bounded by max_entries (stale blocks go first, then LRU).
+    """
+
+    def __init__(self, groups=(), default_ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES, clock=time.monotonic):
+        self.groups = list(groups)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()   # (device_id, start, count) -> (expires, registers)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, address, count):
+        """Shortest TTL of the groups the block overlaps, if they cover all of it; else default_ttl."""
+        overlapping = sorted(g for g in self.groups if g[0] < address + count and address < g[1])
+        covered = address
+        for start, end, _ in overlapping:
+            if start > covered:
+                break
+            covered = max(covered, end)
+        if not overlapping or covered < address + count:
+            return self.default_ttl
+        return min(ttl for _, _, ttl in overlapping)
+
+    def lookup(self, device_id, address, count):
+        """Registers for the range from any fresh block that covers it, else None."""
+        now = self.clock()
+        for key in reversed(self.entries):
+            dev, start, n = key
+            if dev != device_id or not (start <= address and address + count <= start + n):
+                continue
+            expires, registers = self.entries[key]
+            if expires < now:
+                continue
+            self.entries.move_to_end(key)
+            return registers[address - start:address - start + count]
+        return None
+
+    def get(self, device_id, address, count):
+        """lookup() that also counts hits and misses."""
+        registers = self.lookup(device_id, address, count)
+        if registers is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return registers
+
+    def store(self, device_id, address, count, registers):
+        now = self.clock()
+        key = (device_id, address, count)
+        ttl = self.ttl_for(address, count)
+        if ttl <= 0:
+            return
+        self.entries[key] = (now + ttl, list(registers))
+        self.entries.move_to_end(key)
+        # Drop stale blocks first, then the least recently used
+        if len(self.entries) > self.max_entries:
+            for k in [k for k, (expires, _) in self.entries.items() if expires < now]:
+                del self.entries[k]
+                self.evictions += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, device_id=None):
+        """Forget cached blocks (for one device, or all) — e.g. after a write."""
+        for key in [k for k in self.entries if device_id is None or k[0] == device_id]:
+            del self.entries[key]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+        }
+
+
+class CachedClient(RegisterCache):
+    """Wraps a sync client; read_holding_registers is served from cache when fresh.
+
+    Writes through the wrapper drop the device's cached blocks. Any other
+    attribute is passed through to the wrapped client.
+    """
+
+    def __init__(self, client, groups=(), **kwargs):
+        super().__init__(groups, **kwargs)
+        self.client = client
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def read_holding_registers(self, address, *, count=1, device_id=1, **kwargs):
+        registers = self.get(device_id, address, count)
+        if registers is not None:
+            return CachedResponse(registers)
+        rr = self.client.read_holding_registers(address, count=count, device_id=device_id, **kwargs)
+        if not rr.isError():
+            self.store(device_id, address, count, rr.registers)
+        return rr
+
+    def write_register(self, address, value, *, device_id=1, **kwargs):
+        self.invalidate(device_id)
+        return self.client.write_register(address, value, device_id=device_id, **kwargs)
+
+    def write_registers(self, address, values, *, device_id=1, **kwargs):
+        self.invalidate(device_id)
+        return self.client.write_registers(address, values, device_id=device_id, **kwargs)
+
+
+class AsyncCachedClient(CachedClient):
+    """CachedClient for AsyncModbusSerialClient / AsyncModbusTcpClient."""
+
+    async def read_holding_registers(self, address, *, count=1, device_id=1, **kwargs):
+        registers = self.get(device_id, address, count)
+        if registers is not None:
+            return CachedResponse(registers)
+        rr = await self.client.read_holding_registers(address, count=count, device_id=device_id, **kwargs)
+        if not rr.isError():
+            self.store(device_id, address, count, rr.registers)
+        return rr
+
+    async def write_register(self, address, value, *, device_id=1, **kwargs):
+        self.invalidate(device_id)
+        return await self.client.write_register(address, value, device_id=device_id, **kwargs)
+
+    async def write_registers(self, address, values, *, device_id=1, **kwargs):
+        self.invalidate(device_id)
+        return await self.client.write_registers(address, values, device_id=device_id, **kwargs)
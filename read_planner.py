@@ -0,0 +1,98 @@
+from modbus_rtu import char_time, frame_gap, TURNAROUND
+from register_map import try_block, load_map, invalid_ranges, merge_ranges, OK, ILLEGAL
+
+# Turns a set of wanted register addresses into the fewest block reads.
+
+MAX_REGS = 125         # FC3 limit per request
+MODEL = "FRENIC-HVAC"  # Default register map used to keep blocks off illegal addresses
+
+
+def bridge_limit(baud=9600, parity="E", stop=1):
+    """Largest gap (in registers) that is cheaper to read through than to skip.
+
+    An extra request costs 8 request + 5 reply overhead chars, two 3.5-char
+    silent gaps and the slave turnaround; each bridged register only adds
+    2 chars to the reply.
+    """
+    c = char_time(baud, parity, stop)
+    request_cost = 13 * c + 2 * frame_gap(baud, parity, stop) + TURNAROUND
+    return int(request_cost / (2 * c))
+
+
+def known_illegal(model=MODEL):
+    """[start, end) ranges a saved register map marks unreadable (empty if never mapped)."""
+    saved = load_map(model)
+    if saved is None:
+        return []
+    valid, start, end = saved
+    return invalid_ranges(valid, start, end)
+
+
+def _touches(lo, hi, ranges):
+    """True if [lo, hi) overlaps any of the ranges."""
+    return any(lo < r_hi and r_lo < hi for r_lo, r_hi in ranges)
+
+
+def plan_reads(addresses, max_gap=None, illegal=(), max_count=MAX_REGS):
+    """Fewest (start, count) reads covering every address.
+
+    Neighbouring addresses share a block when the gap between them is at most
+    max_gap (default: bridge_limit() at 9600 E 1), the block stays within
+    max_count registers and the bridged gap has no known-illegal address.
+    """
+    if max_gap is None:
+        max_gap = bridge_limit()
+    blocks = []
+    for addr in sorted(set(addresses)):
+        if blocks:
+            start, last = blocks[-1]
+            if (addr - last - 1 <= max_gap and addr - start < max_count
+                    and not _touches(last + 1, addr, illegal)):
+                blocks[-1][1] = addr
+                continue
+        blocks.append([addr, addr])
+    return [(start, last - start + 1) for start, last in blocks]
+
+
+def bridged_gaps(start, count, needed):
+    """[start, end) runs inside a block that are read only to bridge between needed addresses."""
+    needed = set(needed)
+    return merge_ranges([a for a in range(start, start + count) if a not in needed])
+
+
+def tighten(plan, index, wanted, illegal=None):
+    """Replace a rejected bridged block in place by unbridged reads of the wanted addresses.
+
+    The bridged gaps are added to `illegal` (if given) so later plans skip them
+    too. Returns False if the block had nothing to drop.
+    """
+    start, count = plan[index]
+    inside = [a for a in (wanted or ()) if start <= a < start + count]
+    tight = plan_reads(inside, max_gap=0)
+    if not tight or tight == [(start, count)]:
+        return False
+    plan[index:index + 1] = tight
+    if illegal is not None:
+        illegal.extend(bridged_gaps(start, count, inside))
+    return True
+
+
+def read_plan(client, device_id, plan, wanted=None, illegal=None):
+    """Run a plan; returns {address: raw} for every register read.
+
+    If a bridged block is rejected with exception code 2 (an unmapped illegal
+    address in the gap), it is replaced in `plan` by unbridged reads of the
+    wanted addresses, so the bad bridge costs one rejected read once, not every
+    cycle. A block that times out is just missing from the result.
+    """
+    values = {}
+    index = 0
+    while index < len(plan):
+        start, count = plan[index]
+        outcome, regs = try_block(client, device_id, start, count)
+        if outcome == OK:
+            values.update(zip(range(start, start + count), regs))
+        elif outcome == ILLEGAL and tighten(plan, index, wanted, illegal):
+            continue         # Read the tightened blocks now in its place
+        index += 1
+    return values
@@ -0,0 +1,199 @@
+from pymodbus.client import ModbusSerialClient
+from pymodbus.exceptions import ModbusException, ModbusIOException
+import json
+import os
+import time
+
+# === USER SETTINGS ===
+PORT = "COM4"          # Change as needed
+BAUDRATE = 9600
+SLAVE_ID = 9           # Your Fuji VFD ID
+MODEL = "FRENIC-HVAC"  # Register maps are saved per drive model
+
+SCAN_START = 0         # First holding register to map (pymodbus zero-based address)
+SCAN_END = 4000        # End of the mapped space (exclusive)
+MAX_BLOCK = 125        # Largest legal FC3 read
+LEAF_BLOCK = 8         # Failed blocks this small are probed register by register
+NO_REPLY_RETRIES = 1   # Extra tries for a block that got no reply before the slave counts as gone
+
+MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "register_maps")
+
+
+# --- Block read outcomes ---
+OK = "ok"
+ILLEGAL = "illegal"      # Exception code 2: some address in the block does not exist
+REJECTED = "rejected"    # Any other exception reply
+NO_REPLY = "no_reply"    # Timeout or garbled reply
+
+ILLEGAL_ADDRESS = 2
+
+
+class NoReply(ModbusIOException):
+    """The slave stopped answering; carries what was mapped before that."""
+
+    def __init__(self, device_id, address, ranges=(), values=None, transactions=0):
+        super().__init__(f"Device {device_id} did not answer at address {address}")
+        self.device_id = device_id
+        self.address = address
+        self.ranges = ranges
+        self.values = values or {}
+        self.transactions = transactions
+
+
+def try_block(client, device_id, address, count):
+    """(outcome, registers): OK with the registers, else ILLEGAL, REJECTED or NO_REPLY with None."""
+    try:
+        res = client.read_holding_registers(address=address, count=count, device_id=device_id)
+    except ModbusException:
+        return NO_REPLY, None
+    if res.isError():
+        return (ILLEGAL if getattr(res, "exception_code", None) == ILLEGAL_ADDRESS else REJECTED), None
+    return OK, res.registers
+
+
+def read_block(client, device_id, address, count):
+    """Return the registers, or None if the slave rejected the read or did not answer."""
+    return try_block(client, device_id, address, count)[1]
+
+
+def merge_ranges(addresses):
+    """Sorted addresses -> list of [start, end) runs."""
+    ranges = []
+    for addr in addresses:
+        if ranges and ranges[-1][1] == addr:
+            ranges[-1][1] = addr + 1
+        else:
+            ranges.append([addr, addr + 1])
+    return ranges
+
+
+def map_registers(client, device_id, start=SCAN_START, end=SCAN_END, max_block=MAX_BLOCK):
+    """Find every readable holding register in [start, end) by bisection.
+
+    Reads the largest blocks first and splits only the blocks the drive rejects
+    with exception code 2, so each valid/invalid boundary costs about
+    log2(max_block) extra reads. Small rejected blocks go straight to single
+    reads, which keeps long illegal stretches near one read per address (the
+    least any scan can prove them with). Other exception replies mark the block
+    unreadable without splitting it.
+    Returns (valid_ranges, values, transactions), values being {address: raw}.
+    Raises NoReply if a block gets no reply NO_REPLY_RETRIES + 1 times.
+    """
+    values = {}
+    transactions = 0
+
+    # Depth-first so addresses come back in order; stack holds (address, count)
+    stack = [(addr, min(max_block, end - addr)) for addr in range(start, end, max_block)]
+    stack.reverse()
+    while stack:
+        addr, count = stack.pop()
+        for _ in range(NO_REPLY_RETRIES + 1):
+            transactions += 1
+            outcome, regs = try_block(client, device_id, addr, count)
+            if outcome != NO_REPLY:
+                break
+        else:
+            raise NoReply(device_id, addr, merge_ranges(sorted(values)), values, transactions)
+        if outcome == OK:
+            values.update(zip(range(addr, addr + count), regs))
+        elif outcome == ILLEGAL and 1 < count <= LEAF_BLOCK:
+            stack.extend((a, 1) for a in range(addr + count - 1, addr - 1, -1))
+        elif outcome == ILLEGAL and count > 1:
+            half = count // 2
+            stack.append((addr + half, count - half))
+            stack.append((addr, half))
+
+    return merge_ranges(sorted(values)), values, transactions
+
+
+def read_ranges(client, device_id, ranges, max_block=MAX_BLOCK):
+    """Read known-valid [start, end) ranges in max_block chunks; returns {address: raw}.
+
+    A chunk the drive rejects anyway (map out of date) is re-mapped by bisection
+    instead of dropping everything after it. Raises NoReply if the drive is silent.
+    """
+    values = {}
+    for start, end in ranges:
+        for addr in range(start, end, max_block):
+            count = min(max_block, end - addr)
+            outcome, regs = try_block(client, device_id, addr, count)
+            if outcome == OK:
+                values.update(zip(range(addr, addr + count), regs))
+            else:
+                # map_registers retries a silent block and raises if it stays silent
+                values.update(map_registers(client, device_id, addr, addr + count, max_block)[1])
+    return values
+
+
+def invalid_ranges(ranges, start, end):
+    """Complement of the valid ranges inside [start, end)."""
+    gaps = []
+    pos = start
+    for lo, hi in ranges:
+        if lo > pos:
+            gaps.append([pos, min(lo, end)])
+        pos = max(pos, hi)
+    if pos < end:
+        gaps.append([pos, end])
+    return [g for g in gaps if g[0] < g[1]]
+
+
+def map_path(model):
+    return os.path.join(MAP_DIR, f"{model}.json")
+
+
+def save_map(model, ranges, start, end, device_id=None):
+    """Save the valid ranges for a drive model as register_maps/<model>.json."""
+    os.makedirs(MAP_DIR, exist_ok=True)
+    data = {
+        "model": model,
+        "device_id": device_id,
+        "scanned": [start, end],
+        "valid": ranges,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(map_path(model), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return map_path(model)
+
+
+def load_map(model):
+    """Return (valid_ranges, scanned_start, scanned_end) for a model, or None if not mapped yet."""
+    try:
+        with open(map_path(model), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data["valid"], data["scanned"][0], data["scanned"][1]
+
+
+if __name__ == "__main__":
+    client = ModbusSerialClient(
+        port=PORT,
+        baudrate=BAUDRATE,
+        bytesize=8,
+        parity='E',
+        stopbits=1,
+        timeout=1
+    )
+
+    print("🔌 Checking Modbus connection...")
+    if not client.connect():
+        print("❌ Connection failed. Check COM port & wiring.")
+        raise SystemExit(1)
+
+    print(f"🔍 Mapping holding registers {SCAN_START}-{SCAN_END - 1} on device {SLAVE_ID}...\n")
+    started = time.monotonic()
+    try:
+        ranges, values, transactions = map_registers(client, SLAVE_ID)
+    except NoReply as e:
+        print(f"❌ {e} — map not saved. Check the ID and wiring.")
+        raise SystemExit(1)
+    finally:
+        client.close()
+
+    for lo, hi in ranges:
+        print(f"✅ Addr {lo}-{hi - 1}: {hi - lo} registers")
+    print(f"\n📊 {len(values)} readable registers in {len(ranges)} ranges, "
+          f"{transactions} reads, {time.monotonic() - started:.1f} s")
+    print(f"💾 Saved map to {save_map(MODEL, ranges, SCAN_START, SCAN_END, SLAVE_ID)}")
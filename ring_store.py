@@ -0,0 +1,186 @@
+import os
+import time
+
+import numpy as np
+
+# Fixed-size, memory-mapped sample history: one ring file per tag.
+#
+# File layout:
+#   header  64 bytes: magic, capacity, head (total samples ever written), seq
+#   records capacity x RECORD_DTYPE
+# The poller appends in place; other processes open the same file read-only
+# and get numpy views straight onto the mapped pages.
+
+MAGIC = np.frombuffer(b"MBRING01", dtype=np.uint64)[0]
+HEADER_BYTES = 64
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),        # time.time() of the read
+    ("value", "<f8"),    # Scaled value (NaN if the read failed)
+    ("raw", "<u4"),      # Raw register value (32 bits to fit two-register types)
+    ("flags", "<u4"),    # 0 = good, 1 = read failed
+])
+GOOD, FAILED = 0, 1
+
+# Header slots (uint64 each)
+H_MAGIC, H_CAPACITY, H_HEAD, H_SEQ = range(4)
+
+
+def capacity_for(days, rate_hz=1.0):
+    """Records needed to keep `days` of history at `rate_hz`."""
+    return int(days * 86400 * rate_hz)
+
+
+def file_size(capacity):
+    return HEADER_BYTES + capacity * RECORD_DTYPE.itemsize
+
+
+def create_ring(path, capacity, records=None):
+    """Write a new ring file, optionally pre-filled with records (oldest first, at most capacity)."""
+    mm = np.memmap(path, dtype=np.uint8, mode="w+", shape=(file_size(capacity),))
+    header = mm[:HEADER_BYTES].view(np.uint64)
+    header[H_MAGIC] = MAGIC
+    header[H_CAPACITY] = capacity
+    if records is not None and len(records):
+        mm[HEADER_BYTES:HEADER_BYTES + len(records) * RECORD_DTYPE.itemsize] = records.view(np.uint8)
+        header[H_HEAD] = len(records)
+    mm.flush()
+    del mm
+
+
+def stored_capacity(path):
+    with open(path, "rb") as f:
+        header = np.frombuffer(f.read(HEADER_BYTES), dtype=np.uint64)
+    if len(header) <= H_CAPACITY or header[H_MAGIC] != MAGIC:
+        raise ValueError(f"{path} is not a ring file")
+    return int(header[H_CAPACITY])
+
+
+def resize_ring(path, capacity):
+    """Rewrite a ring with a new capacity, keeping its newest records (cycle or days changed)."""
+    old = RingBuffer(path)
+    records = old.snapshot()[-capacity:]
+    del old
+    tmp = path + ".resize"
+    create_ring(tmp, capacity, np.ascontiguousarray(records))
+    os.replace(tmp, path)
+
+
+class RingBuffer:
+    """One memory-mapped ring. mode "w" = the writer (creates the file), "r" = a reader."""
+
+    def __init__(self, path, capacity=None, mode="r"):
+        if mode == "w" and not os.path.exists(path):
+            if not capacity:
+                raise ValueError("capacity is required to create a ring file")
+            create_ring(path, capacity)
+        elif mode == "w" and capacity:
+            stored = stored_capacity(path)
+            if stored != capacity:
+                resize_ring(path, capacity)
+                print(f"⚠️ {os.path.basename(path)}: capacity {stored} → {capacity}, history migrated")
+        mm = np.memmap(path, dtype=np.uint8, mode="r+" if mode == "w" else "r")
+        header = mm[:HEADER_BYTES].view(np.uint64)
+        if header[H_MAGIC] != MAGIC:
+            raise ValueError(f"{path} is not a ring file")
+        if capacity and int(header[H_CAPACITY]) != capacity:
+            raise ValueError(f"{path} has capacity {int(header[H_CAPACITY])}, expected {capacity}")
+
+        self.path = path
+        self.capacity = int(header[H_CAPACITY])
+        self._mm = mm
+        self._header = header
+        self.records = mm[HEADER_BYTES:file_size(self.capacity)].view(RECORD_DTYPE)
+        # Field views, so append() only does scalar stores into the mapping
+        self._t = self.records["t"]
+        self._value = self.records["value"]
+        self._raw = self.records["raw"]
+        self._flags = self.records["flags"]
+
+    # --- Writer ---
+
+    def append(self, t, raw, value, flags=GOOD):
+        header = self._header
+        head = int(header[H_HEAD])
+        i = head % self.capacity
+        header[H_SEQ] += 1           # Odd: write in progress
+        self._t[i] = t
+        self._value[i] = value
+        self._raw[i] = raw
+        self._flags[i] = flags
+        header[H_HEAD] = head + 1
+        header[H_SEQ] += 1           # Even: consistent again
+
+    def flush(self):
+        self._mm.flush()
+
+    # --- Readers ---
+
+    def __len__(self):
+        return min(int(self._header[H_HEAD]), self.capacity)
+
+    def views(self, n=None):
+        """Zero-copy views of the newest n records, oldest first, as (older, newer).
+
+        The second view is empty unless the range wraps. The writer may overwrite
+        these records later; use snapshot() for a stable copy.
+        """
+        head = int(self._header[H_HEAD])
+        count = min(head, self.capacity) if n is None else min(n, head, self.capacity)
+        end = head % self.capacity
+        start = end - count
+        if start >= 0:
+            return self.records[start:end], self.records[0:0]
+        return self.records[start + self.capacity:], self.records[:end]
+
+    def snapshot(self, n=None, retries=1000):
+        """Consistent copy of the newest n records, oldest first."""
+        for _ in range(retries):
+            seq = int(self._header[H_SEQ])
+            if seq % 2:
+                time.sleep(0)        # Let the writer finish
+                continue
+            older, newer = self.views(n)
+            data = np.concatenate((older, newer))
+            if int(self._header[H_SEQ]) == seq:
+                return data
+            time.sleep(0)
+        raise RuntimeError(f"{self.path}: writer kept the ring busy, no consistent snapshot")
+
+    def latest(self):
+        """(t, raw, value, flags) of the newest record, or None if empty."""
+        older, newer = self.views(1)
+        rec = (newer if len(newer) else older)
+        if not len(rec):
+            return None
+        r = rec[0]
+        return float(r["t"]), int(r["raw"]), float(r["value"]), int(r["flags"])
+
+
+class RingStore:
+    """A directory of rings, one per (device, tag)."""
+
+    def __init__(self, directory, capacity, mode="w"):
+        self.directory = directory
+        self.capacity = capacity
+        self.mode = mode
+        self.rings = {}
+        if mode == "w":
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, device, tag):
+        return os.path.join(self.directory, f"{device}.{tag}.ring")
+
+    def ring(self, device, tag):
+        key = (device, tag)
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = RingBuffer(self.path(device, tag), self.capacity if self.mode == "w" else None, self.mode)
+            self.rings[key] = ring
+        return ring
+
+    def append(self, device, tag, t, raw, value, flags=GOOD):
+        self.ring(device, tag).append(t, raw, value, flags)
+
+    def flush(self):
+        for ring in self.rings.values():
+            ring.flush()
@@ -0,0 +1,97 @@
+import numpy as np
+
+from decode import Decoder
+
+# Vectorized raw-register -> engineering-value conversion.
+#
+# Every format used in these scripts is linear once the register is read as
+# signed or unsigned 16-bit, so a whole table reduces to three arrays
+# (signed, scale, offset) and one multiply-add over the block.
+#
+# Spec dicts:
+#   {"format": "4-20mA",  "full_scale": 60}           (raw - 4000) * FS / 16000   (µA, temp5.py)
+#   {"format": "0-10V",   "full_scale": 100}          raw * FS / 10000            (mV, temp5.py)
+#   {"format": "pm20000", "full_scale": 60}           signed raw * FS / 20000     (Fuji format [29], temp6.py)
+#   {"format": "pm10V"}                               signed raw * 10 / 32767 V   (temp11.py M49/M54)
+#   {"format": "pm10V",   "full_scale": 60}           -10..+10 V mapped to 0..FS  (temp12.py)
+#   {"format": "factor",  "scale": 0.001755, "offset": 0, "signed": False}        (temp10.py, temp4.py)
+#   {"format": "raw"}
+# "low" (default 0) shifts the 4-20mA / 0-10V ranges, e.g. -20..+80 °C.
+#
+# A "type" (decode.py: int16/uint16/int32/uint32/float32, "word_order", "mask")
+# is decoded first and overrides the format's signedness, e.g. running hours:
+#   {"format": "factor", "scale": 0.1, "type": "uint32", "word_order": "little"}
+
+FORMATS = ("4-20mA", "0-10V", "pm20000", "pm10V", "factor", "raw")
+
+
+def linear_coeffs(spec):
+    """(signed, scale, offset) so that value = raw * scale + offset."""
+    fmt = spec.get("format", "raw")
+    fs = float(spec.get("full_scale", 1.0))
+    low = float(spec.get("low", 0.0))
+    if fmt == "4-20mA":
+        return False, fs / 16000, low - 4000 * fs / 16000
+    if fmt == "0-10V":
+        return False, fs / 10000, low
+    if fmt == "pm20000":
+        return True, fs / 20000, 0.0
+    if fmt == "pm10V":
+        if "full_scale" not in spec:
+            return True, 10.0 / 32767, 0.0
+        return True, fs / (2 * 32767), fs / 2
+    if fmt == "factor":
+        return bool(spec.get("signed", False)), float(spec.get("scale", 1.0)), float(spec.get("offset", 0.0))
+    if fmt == "raw":
+        return bool(spec.get("signed", False)), 1.0, 0.0
+    raise ValueError(f"Unknown register format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+class ScalingTable:
+    """Per-register conversion compiled into arrays.
+
+    specs[i] describes column i of the raw block, or column columns[i] when
+    columns is given (to pick scattered registers out of a wider block read).
+    convert() accepts any shape (..., n_registers), e.g. devices x registers.
+    """
+
+    def __init__(self, specs, columns=None):
+        coeffs = [linear_coeffs(spec) for spec in specs]
+        self.signed = np.array([c[0] for c in coeffs], dtype=bool)
+        self.scale = np.array([c[1] for c in coeffs], dtype=np.float64)
+        self.offset = np.array([c[2] for c in coeffs], dtype=np.float64)
+        self.columns = None if columns is None else np.asarray(columns, dtype=np.intp)
+        self.any_signed = bool(self.signed.any())
+        self.decoder = None
+        if any("type" in spec or "mask" in spec for spec in specs):
+            # Typed tags: decode everything (16-bit signedness from the format unless typed)
+            typed = [spec if "type" in spec else dict(spec, type="int16" if signed else "uint16")
+                     for spec, signed in zip(specs, self.signed)]
+            self.decoder = Decoder(typed, self.columns)
+
+    def convert(self, raw, out=None):
+        """Scale a raw uint16 block in one pass; returns float64 values."""
+        raw = np.asarray(raw, dtype=np.uint16)
+        if self.decoder is not None:
+            out = self.decoder.decode(raw, out)
+            np.multiply(out, self.scale, out=out)
+            np.add(out, self.offset, out=out)
+            return out
+        if self.columns is not None:
+            raw = raw[..., self.columns]
+        if self.any_signed:
+            vals = np.where(self.signed, raw.view(np.int16), raw)
+        else:
+            vals = raw
+        if out is None:
+            out = np.empty(vals.shape, dtype=np.float64)
+        np.multiply(vals, self.scale, out=out)
+        np.add(out, self.offset, out=out)
+        return out
+
+
+def scale_values(raw, spec):
+    """Convert an array where every register has the same spec."""
+    signed, scale, offset = linear_coeffs(spec)
+    raw = np.asarray(raw, dtype=np.uint16)
+    return (raw.view(np.int16) if signed else raw) * scale + offset
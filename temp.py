@@ -1,9 +1,13 @@
 from pymodbus.client import ModbusSerialClient
+from register_map import map_registers, save_map
 
 # === USER SETTINGS ===
 PORT = "COM4"          # Change as needed
 BAUDRATE = 9600
 SLAVE_ID = 9           # Your Fuji VFD ID
+MODEL = "FRENIC-HVAC"  # Map is saved under register_maps/<MODEL>.json
+SCAN_START = 0
+SCAN_END = 4000        # Covers the 0–3049 windows this script used to probe
 
 # === CONNECT ===
 client = ModbusSerialClient(
@@ -22,31 +26,23 @@ if not client.connect():
     exit()
 
 print("✅ Connected successfully.\n")
-print("🔍 Probing common Fuji register ranges...\n")
-
-# === TEST ADDRESS BLOCKS ===
-ranges = [
-    (0, 50),
-    (500, 50),
-    (1000, 50),
-    (1500, 50),
-    (1800, 50),
-    (2000, 50),
-    (2100, 50),
-    (2200, 50),
-    (3000, 50)
-]
-
-for start, count in ranges:
-    try:
-        res = client.read_holding_registers(address=start, count=count, device_id=SLAVE_ID)
-        if res.isError():
-            print(f"❌ Addr {start}-{start+count-1}: No response / invalid")
-        else:
-            print(f"✅ Addr {start}-{start+count-1}: OK ({len(res.registers)} registers read)")
-            print(f"   Sample: {res.registers[:10]}")
-    except Exception as e:
-        print(f"⚠️ Addr {start}-{start+count-1}: Exception {e}")
+print("🔍 Mapping readable Fuji register ranges (largest blocks first, split on error)...\n")
+
+try:
+    ranges, values, transactions = map_registers(client, SLAVE_ID, SCAN_START, SCAN_END)
+except Exception as e:
+    print(f"⚠️ Exception during scan: {e}")
+    client.close()
+    raise SystemExit(1)
 
 client.close()
-print("\n🔚 Scan complete. Note which address ranges show 'OK' — those contain your live data.")
+
+for lo, hi in ranges:
+    print(f"✅ Addr {lo}-{hi - 1}: OK ({hi - lo} registers)")
+    print(f"   Sample: {[values[a] for a in range(lo, min(hi, lo + 10))]}")
+
+if not ranges:
+    print(f"❌ Addr {SCAN_START}-{SCAN_END - 1}: No response / invalid")
+else:
+    print(f"\n💾 Map saved to {save_map(MODEL, ranges, SCAN_START, SCAN_END, SLAVE_ID)} ({transactions} reads)")
+print("\n🔚 Scan complete. Ranges marked 'OK' contain your live data.")
@@ -1,4 +1,5 @@
 from pymodbus.client import ModbusSerialClient
+from device_health import HealthMonitor, HealthClient
 
 # ---------------------- CONFIGURATION ----------------------
 PORT = "COM4"
@@ -33,6 +34,9 @@ if not client.connect():
     print("❌ Connection failed. Check port and wiring.")
     raise SystemExit(1)
 
+# A drive that times out once is skipped for the rest of the pass
+client = HealthClient(client, HealthMonitor(DEVICE_IDS, threshold=1))
+
 try:
     print("\n📡 Reading data from Modbus devices...\n")
 
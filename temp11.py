@@ -1,4 +1,6 @@
 from pymodbus.client import ModbusSerialClient
+from read_planner import plan_reads, read_plan, bridge_limit, known_illegal
+from device_health import HealthMonitor, HealthClient
 
 # ---------------------- CONFIGURATION ----------------------
 PORT = "COM4"
@@ -23,6 +25,10 @@ RH_SCALE   = 0.00504    # as per calibration
 # Voltage scaling (M49, M54): -32768 → +32767 maps to -10V → +10V
 def scale_voltage(raw):
     return (raw / 32767.0) * 10.0
+
+# pymodbus uses zero-based addressing; all four registers are fetched in as few block reads as possible
+WANTED = [TEMP_REG - 1, RH_REG - 1, M49_REG - 1, M54_REG - 1]
+READ_PLAN = plan_reads(WANTED, max_gap=bridge_limit(BAUDRATE, PARITY, STOPBITS), illegal=known_illegal())
 # ------------------------------------------------------------
 
 
@@ -39,6 +45,9 @@ if not client.connect():
     print("❌ Connection failed. Check port and wiring.")
     raise SystemExit(1)
 
+# A drive that times out once is skipped for the rest of the pass (its other blocks would time out too)
+client = HealthClient(client, HealthMonitor(DEVICE_IDS, threshold=1))
+
 try:
     print("\n📡 Reading data from Modbus devices...\n")
 
@@ -46,21 +55,18 @@ try:
         print(f"--- 🧭 Device ID: {device_id} ---")
 
         try:
-            # Read all required registers
-            temp_rr = client.read_holding_registers(address=TEMP_REG - 1, count=1, device_id=device_id)
-            rh_rr   = client.read_holding_registers(address=RH_REG - 1,   count=1, device_id=device_id)
-            m49_rr  = client.read_holding_registers(address=M49_REG - 1,  count=1, device_id=device_id)
-            m54_rr  = client.read_holding_registers(address=M54_REG - 1,  count=1, device_id=device_id)
+            # Read all required registers (block reads from READ_PLAN)
+            values = read_plan(client, device_id, READ_PLAN, WANTED)
 
-            if any(rr.isError() for rr in [temp_rr, rh_rr, m49_rr, m54_rr]):
+            if any(addr not in values for addr in WANTED):
                 print(f"  ❌ Read error on device {device_id}")
                 continue
 
             # Raw register values
-            raw_temp = temp_rr.registers[0]
-            raw_rh   = rh_rr.registers[0]
-            raw_m49  = m49_rr.registers[0]
-            raw_m54  = m54_rr.registers[0]
+            raw_temp = values[TEMP_REG - 1]
+            raw_rh   = values[RH_REG - 1]
+            raw_m49  = values[M49_REG - 1]
+            raw_m54  = values[M54_REG - 1]
 
             # Apply scaling
             temperature = raw_temp * TEMP_SCALE
@@ -1,8 +1,11 @@
 from pymodbus.client import ModbusSerialClient
+from decode import decode_value
+from read_planner import plan_reads, read_plan
 
 PORT = "COM4"
 BAUDRATE = 9600
 SLAVE_ID = 9
+INT16 = {"type": "int16"}
 
 client = ModbusSerialClient(
     port=PORT,
@@ -22,20 +25,15 @@ try:
     temp_addr = 2098 - 1   # M49 / M54 type
     rh_addr   = 2103 - 1
 
-    temp_rr = client.read_holding_registers(address=temp_addr, count=1, device_id=SLAVE_ID)
-    rh_rr   = client.read_holding_registers(address=rh_addr,   count=1, device_id=SLAVE_ID)
+    # One block read covers both registers
+    values = read_plan(client, SLAVE_ID, plan_reads([temp_addr, rh_addr]), [temp_addr, rh_addr])
 
-    if temp_rr.isError() or rh_rr.isError():
+    if temp_addr not in values or rh_addr not in values:
         print("❌ Read error – check communication settings, unit id, parity, baud.")
     else:
         # Convert to signed 16-bit integer
-        raw_temp = temp_rr.registers[0]
-        if raw_temp > 32767:
-            raw_temp -= 65536
-
-        raw_rh = rh_rr.registers[0]
-        if raw_rh > 32767:
-            raw_rh -= 65536
+        raw_temp = decode_value([values[temp_addr]], INT16)
+        raw_rh = decode_value([values[rh_addr]], INT16)
 
         # Full-scale voltage interpretation (–10V to +10V)
         temp_voltage = (raw_temp / 32767) * 10
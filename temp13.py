@@ -1,8 +1,10 @@
 from pymodbus.client import ModbusSerialClient
+from decode import decode_value
 
 PORT = "COM4"
 BAUDRATE = 9600
 SLAVE_ID = 9
+INT16 = {"type": "int16"}
 
 client = ModbusSerialClient(
     port=PORT,
@@ -29,13 +31,8 @@ try:
         print("❌ Read error – check communication settings, unit id, parity, baud.")
     else:
         # Convert to signed 16-bit integer
-        raw_temp = temp_rr.registers[0]
-        if raw_temp > 32767:
-            raw_temp -= 65536
-
-        raw_rh = rh_rr.registers[0]
-        if raw_rh > 32767:
-            raw_rh -= 65536
+        raw_temp = decode_value(temp_rr.registers, INT16)
+        raw_rh = decode_value(rh_rr.registers, INT16)
 
         # Full-scale voltage interpretation (–10V to +10V)
         temp_voltage = (raw_temp / 32767) * 10
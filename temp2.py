@@ -1,4 +1,7 @@
 from pymodbus.client import ModbusSerialClient
+from bus_capture import CaptureWriter, CaptureClient
+from change_detect import ChangeDetector
+from datetime import datetime
 import time
 
 PORT = "COM4"
@@ -7,6 +10,8 @@ SLAVE_ID = 9
 
 START_ADDR = 2100
 NUM_REGS = 50
+DEADBAND = 5           # Counts; a list of NUM_REGS values sets one per register
+CAPTURE_FILE = None    # e.g. "temp2.mbc" to record every read for offline replay (bus_capture.py)
 
 client = ModbusSerialClient(
     port=PORT,
@@ -21,9 +26,12 @@ if not client.connect():
     print("❌ Connection failed.")
     exit()
 
+if CAPTURE_FILE:
+    client = CaptureClient(client, CaptureWriter(CAPTURE_FILE))
+
 print(f"✅ Connected. Monitoring {NUM_REGS} registers from {START_ADDR}...\n")
 
-prev = [0] * NUM_REGS
+detector = ChangeDetector(NUM_REGS, deadband=DEADBAND, report_first=False)
 
 while True:
     try:
@@ -33,11 +41,10 @@ while True:
             time.sleep(1)
             continue
 
-        data = res.registers
-        for i, val in enumerate(data):
-            if abs(val - prev[i]) > 5:  # change threshold
-                print(f"Reg {START_ADDR + i}: {val}")
-        prev = data
+        changes = detector.update(res.registers, time.time())
+        stamp = datetime.fromtimestamp(changes.timestamp).strftime('%H:%M:%S')
+        for i, val, old in changes:
+            print(f"[{stamp}] Reg {START_ADDR + i}: {val:.0f} (was {old:.0f})")
         time.sleep(1)
 
     except KeyboardInterrupt:
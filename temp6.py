@@ -1,4 +1,6 @@
 from pymodbus.client import ModbusSerialClient
+from scaling import ScalingTable
+import numpy as np
 import time
 from datetime import datetime
 
@@ -13,6 +15,12 @@ RH_REG = 2122           # AI2 (Humidity, terminal V2)
 TEMP_FULL_SCALE = 60.0   # Temperature 0–60°C
 RH_FULL_SCALE = 100.0    # Humidity 0–100% RH
 
+# Data format [29]: ±20000 = ±100%, signed
+SCALING = ScalingTable([
+    {"format": "pm20000", "full_scale": TEMP_FULL_SCALE},
+    {"format": "pm20000", "full_scale": RH_FULL_SCALE},
+])
+
 # === CONNECT TO MODBUS ===
 client = ModbusSerialClient(
     port=PORT,
@@ -40,18 +48,11 @@ try:
             time.sleep(1)
             continue
 
-        raw_temp = rr.registers[0]
-        raw_rh = rr.registers[1]
-
-        # Convert signed values (handle negatives)
-        if raw_temp > 32767:
-            raw_temp -= 65536
-        if raw_rh > 32767:
-            raw_rh -= 65536
+        raw = np.array(rr.registers, dtype=np.uint16)
+        raw_temp, raw_rh = raw.view(np.int16).tolist()   # Signed values (handle negatives)
 
         # Apply scaling (Data format [29]: ±20000 = ±100%)
-        temp_c = (raw_temp / 20000) * TEMP_FULL_SCALE
-        rh_percent = (raw_rh / 20000) * RH_FULL_SCALE
+        temp_c, rh_percent = SCALING.convert(raw).tolist()
 
         print(f"[{datetime.now().strftime('%H:%M:%S')}] "
               f"RawTemp={raw_temp:6d} RawRH={raw_rh:6d} → "
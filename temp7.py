@@ -1,4 +1,5 @@
 from pymodbus.client import ModbusSerialClient
+from read_planner import plan_reads, read_plan
 
 PORT = "COM4"
 BAUDRATE = 9600
@@ -23,14 +24,14 @@ try:
     temp_addr = 2098 - 1
     rh_addr   = 2103 - 1
 
-    temp_rr = client.read_holding_registers(address=temp_addr, count=1, device_id=SLAVE_ID)
-    rh_rr   = client.read_holding_registers(address=rh_addr,   count=1, device_id=SLAVE_ID)
+    # One block read covers both registers
+    values = read_plan(client, SLAVE_ID, plan_reads([temp_addr, rh_addr]), [temp_addr, rh_addr])
 
-    if temp_rr.isError() or rh_rr.isError():
+    if temp_addr not in values or rh_addr not in values:
         print("❌ Read error – check communication settings, unit id, parity, baud.")
     else:
-        raw_temp = temp_rr.registers[0]
-        raw_rh   = rh_rr.registers[0]
+        raw_temp = values[temp_addr]
+        raw_rh   = values[rh_addr]
         # show both raw and ModScan style address for clarity
         print("Raw register values:")
         print(f"  Requested (pymodbus addr) {temp_addr}  => Reg 2098 (doc) -> {raw_temp}")
@@ -0,0 +1,24 @@
+from bus_sniffer import Traffic, classify, REQUEST, RESPONSE
+from modbus_rtu import read_request, with_crc
+
+
+def test_silent_slave_polled_at_two_blocks():
+    traffic = Traffic()
+    for cycle in range(3):
+        traffic.add(read_request(9, 2097, 4), cycle)        # Expects 8 data bytes; 2120 >> 8 == 8
+        traffic.add(read_request(9, 2120, 2), cycle + 0.5)
+    assert traffic.device_ids() == []
+    assert traffic.silent_ids() == [9]
+    assert [row[:5] for row in traffic.poll_table()] == [(9, 3, 2097, 4, 3), (9, 3, 2120, 2, 3)]
+
+
+def test_short_coil_reply_is_a_response():
+    request = read_request(5, 0, 20, function=1)
+    reply = with_crc(bytes([5, 1, 3, 1, 2, 3]))
+    assert len(reply) == 8
+    assert classify(reply, request)[0] == RESPONSE
+    assert classify(reply)[0] == REQUEST
+    traffic = Traffic()
+    traffic.add(request, 0.0)
+    traffic.add(reply, 0.1)
+    assert traffic.device_ids() == [5]
@@ -0,0 +1,47 @@
+import pytest
+
+from modbus_rtu import read_reply, response_timeout, turnaround, TURNAROUND, USB_LATENCY
+
+
+def test_faster_baud_gets_shorter_timeout():
+    for parity in ("N", "E", "O"):
+        for stop in (1, 2):
+            timeouts = [response_timeout(baud, parity, stop) for baud in (4800, 9600, 19200, 38400)]
+            assert timeouts == sorted(timeouts, reverse=True)
+            assert response_timeout(38400, parity, stop) < response_timeout(9600, parity, stop)
+
+
+def test_timeout_is_wire_time_plus_margins():
+    margins = TURNAROUND + USB_LATENCY
+    assert response_timeout(38400) - margins < 0.01
+    assert response_timeout(38400, usb_latency=0) == pytest.approx(response_timeout(38400) - USB_LATENCY)
+
+
+def test_longer_response_delay_extends_timeout():
+    assert response_timeout(9600, turnaround=turnaround(0.3)) - response_timeout(9600) == pytest.approx(0.3 - 0.01)
+
+
+class Port:
+    """Replays `data`; a read past the end returns short, as a port does after its timeout."""
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.waited = 0
+
+    def read(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        if len(chunk) < n:
+            self.waited += 1
+        return chunk
+
+
+def test_garbled_function_code_returns_at_once():
+    port = Port(b"\x07\x3c")
+    assert read_reply(port) == b"\x07\x3c"
+    assert port.waited == 0
+
+
+def test_exception_reply_is_read_whole():
+    port = Port(b"\x07\x83\x02\x00\x00")
+    assert read_reply(port) == b"\x07\x83\x02\x00\x00"
+    assert port.waited == 0
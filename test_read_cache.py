@@ -0,0 +1,65 @@
+from read_cache import CachedClient
+
+
+class Reply:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class FakeSlave:
+    def __init__(self):
+        self.reads = 0
+
+    def read_holding_registers(self, address, count=1, device_id=1):
+        self.reads += 1
+        return Reply(list(range(address, address + count)))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unlisted_address_always_reaches_the_bus():
+    slave = FakeSlave()
+    cached = CachedClient(slave, groups=[(2097, 2103, 1.0)], clock=Clock())
+    for _ in range(3):
+        assert cached.read_holding_registers(2120, count=2, device_id=7).registers == [2120, 2121]
+    assert slave.reads == 3
+    assert cached.entries == {}
+
+
+def test_listed_group_is_served_from_cache_until_stale():
+    slave = FakeSlave()
+    clock = Clock()
+    cached = CachedClient(slave, groups=[(2097, 2103, 1.0)], clock=clock)
+    cached.read_holding_registers(2097, count=6, device_id=7)
+    assert cached.read_holding_registers(2099, count=2, device_id=7).registers == [2099, 2100]
+    assert slave.reads == 1
+    clock.now = 1.5
+    cached.read_holding_registers(2099, count=2, device_id=7)
+    assert slave.reads == 2
+
+
+def test_block_straddling_a_group_boundary_is_not_cached():
+    slave = FakeSlave()
+    cached = CachedClient(slave, groups=[(2097, 2103, 1.0)], clock=Clock())
+    cached.read_holding_registers(2100, count=6, device_id=7)        # 2100-2105, group ends at 2103
+    cached.read_holding_registers(2104, count=1, device_id=7)
+    cached.read_holding_registers(2100, count=2, device_id=7)
+    assert slave.reads == 3
+    assert list(cached.entries) == [(7, 2100, 2)]                     # Only the read inside the group
+
+
+def test_block_covered_by_adjacent_groups_is_cached():
+    slave = FakeSlave()
+    cached = CachedClient(slave, groups=[(2097, 2103, 1.0), (2103, 2110, 0.5)], clock=Clock())
+    cached.read_holding_registers(2100, count=6, device_id=7)
+    cached.read_holding_registers(2104, count=1, device_id=7)
+    assert slave.reads == 1
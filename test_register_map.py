@@ -0,0 +1,63 @@
+import pytest
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.pdu import ExceptionResponse
+
+import register_map
+from register_map import map_registers, read_ranges, NoReply
+
+
+class Reply:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class FakeSlave:
+    """Answers FC3 reads over `valid` [start, end) ranges; silent=True never answers."""
+
+    def __init__(self, valid=(), silent=False, code=2):
+        self.valid = valid
+        self.silent = silent
+        self.code = code
+        self.reads = 0
+
+    def read_holding_registers(self, address, count=1, device_id=1):
+        self.reads += 1
+        if self.silent:
+            raise ModbusIOException("No response received")
+        if any(lo <= address and address + count <= hi for lo, hi in self.valid):
+            return Reply(list(range(address, address + count)))
+        return ExceptionResponse(3, self.code)
+
+
+def test_silent_slave_gives_up_after_retry():
+    slave = FakeSlave(silent=True)
+    with pytest.raises(NoReply) as info:
+        map_registers(slave, 5, 0, 60)
+    assert slave.reads == register_map.NO_REPLY_RETRIES + 1
+    assert info.value.device_id == 5
+    assert info.value.values == {}
+
+
+def test_silent_slave_on_read_ranges():
+    slave = FakeSlave(silent=True)
+    with pytest.raises(NoReply):
+        read_ranges(slave, 5, [[0, 60]])
+    assert slave.reads <= 3
+
+
+def test_illegal_address_still_bisects():
+    slave = FakeSlave(valid=[(0, 40), (50, 60)])
+    ranges, values, transactions = map_registers(slave, 1, 0, 60)
+    assert ranges == [[0, 40], [50, 60]]
+    assert sorted(values) == list(range(40)) + list(range(50, 60))
+    assert transactions == slave.reads
+
+
+def test_other_exception_is_not_split():
+    slave = FakeSlave(valid=[(0, 40)], code=4)
+    ranges, values, transactions = map_registers(slave, 1, 0, 60)
+    assert ranges == []
+    assert transactions == 1